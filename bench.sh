@@ -0,0 +1 @@
+PYTHONPATH=src python3 -m bench "$@"
\ No newline at end of file
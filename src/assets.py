@@ -0,0 +1,143 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import remove_output
+
+COPY_THREADS = 8
+
+
+class SyncReport:
+    def __init__(self) -> None:
+        self.copied = 0
+        self.skipped = 0
+        self.removed = 0
+        self.bytes_copied = 0
+        self.bytes_skipped = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.copied} copied ({format_size(self.bytes_copied)}), "
+            f"{self.skipped} unchanged ({format_size(self.bytes_skipped)}), "
+            f"{self.removed} removed"
+        )
+
+
+def format_size(size: int) -> str:
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def sync_dir(
+    source: str,
+    destination: str,
+    synced: dict[str, str],
+    link: bool = False,
+    threads: int = COPY_THREADS,
+) -> SyncReport:
+
+    report = SyncReport()
+    files = {}
+    candidates = []
+
+    # Walk the tree once, reusing the directory entries scandir already has
+    stack = [(source, destination)]
+    while len(stack) > 0:
+        src_dir, dest_dir = stack.pop()
+        # Pages may be writing into the same folders from other threads
+        os.makedirs(dest_dir, exist_ok=True)
+
+        for entry in os.scandir(src_dir):
+            dest_path = os.path.join(dest_dir, entry.name)
+
+            if entry.is_dir():
+                stack.append((entry.path, dest_path))
+                continue
+
+            files[dest_path] = entry.path
+            candidates.append((entry, dest_path))
+
+    # Comparing with the output costs a stat per file, which adds up on
+    # network filesystems, so the copy threads do that too
+    def sync(candidate: tuple[os.DirEntry, str]) -> tuple[bool, int]:
+        entry, dest_path = candidate
+        stat = entry.stat()
+
+        if is_unchanged(stat, dest_path):
+            return False, stat.st_size
+
+        sync_file(entry.path, dest_path, link)
+        return True, stat.st_size
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        for copied, size in executor.map(sync, candidates):
+            if copied:
+                report.copied += 1
+                report.bytes_copied += size
+            else:
+                report.skipped += 1
+                report.bytes_skipped += size
+
+    # Outputs synced by an earlier build whose source is gone
+    for dest_path in synced:
+        if dest_path not in files and remove_output(dest_path, destination):
+            report.removed += 1
+
+    synced.clear()
+    synced.update(files)
+
+    return report
+
+
+def is_unchanged(stat: os.stat_result, dest_path: str) -> bool:
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+
+    return (
+        dest_stat.st_size == stat.st_size and dest_stat.st_mtime_ns == stat.st_mtime_ns
+    )
+
+
+def sync_file(src_path: str, dest_path: str, link: bool = False):
+
+    # Replace rather than overwrite, the old output may be a hard link
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+
+    try:
+        if link:
+            try:
+                os.link(src_path, tmp_path)
+                os.replace(tmp_path, dest_path)
+                return
+            except OSError:
+                # Different filesystems or no hard link support, copy instead
+                pass
+
+        copy_file(src_path, tmp_path)
+        shutil.copystat(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def copy_file(src_path: str, dest_path: str):
+
+    with open(src_path, "rb") as fsrc, open(dest_path, "wb") as fdst:
+        # copy_file_range stays in the kernel and can share blocks on
+        # filesystems with reflinks
+        if hasattr(os, "copy_file_range"):
+            try:
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30) > 0:
+                    pass
+                return
+            except OSError:
+                pass
+
+    # shutil uses sendfile where the platform has it
+    shutil.copyfile(src_path, dest_path)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import tracing
+from imagemeta import ImageSizes
+from page import STREAM_THRESHOLD, generate_page_job, render_page_job, start_worker
+
+# Pages read, rendered or written at the same time
+IO_CONCURRENCY = 32
+
+
+def render_pages_async(
+    jobs_args: list[tuple], jobs: int = 1, concurrency: int = IO_CONCURRENCY
+) -> list:
+    # Same jobs and results as render_pages, but reads and writes run on
+    # I/O threads while other pages render, instead of one after another
+    return asyncio.run(render_pipeline(jobs_args, jobs, max(1, concurrency)))
+
+
+async def render_pipeline(jobs_args: list[tuple], jobs: int, concurrency: int) -> list:
+
+    # Bounds how many pages are held in memory, not just open files
+    in_flight = asyncio.Semaphore(concurrency)
+
+    # Every page is rendered with the same image sizes, worker processes are
+    # sent them once when they start
+    image_sizes = (
+        jobs_args[0][6] if len(jobs_args) > 0 and len(jobs_args[0]) > 6 else None
+    )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as io_executor:
+        with render_pool(jobs, image_sizes) as render_executor:
+            in_workers = isinstance(render_executor, ProcessPoolExecutor)
+            return await asyncio.gather(
+                *(
+                    render_page_async(
+                        job_args, in_flight, io_executor, render_executor, in_workers
+                    )
+                    for job_args in jobs_args
+                )
+            )
+
+
+async def render_page_async(
+    job_args: tuple,
+    in_flight: asyncio.Semaphore,
+    io_executor: Executor,
+    render_executor: Executor,
+    in_workers: bool = False,
+) -> tuple:
+
+    loop = asyncio.get_running_loop()
+    base_path, src_path, template_path, dest_path = job_args[:4]
+    block_cache = job_args[4] if len(job_args) > 4 else None
+    stream_threshold = job_args[5] if len(job_args) > 5 else STREAM_THRESHOLD
+    image_sizes = job_args[6] if len(job_args) > 6 else None
+    listing = job_args[7] if len(job_args) > 7 else None
+
+    async with in_flight:
+        try:
+            markdown = await loop.run_in_executor(
+                io_executor, read_source, src_path, stream_threshold
+            )
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", [], None, None
+
+        if markdown is None:
+            # Too big to load whole, it streams on an I/O thread
+            return await loop.run_in_executor(io_executor, generate_page_job, job_args)
+
+        page_template_path, html, error, events, stats, page_doc = (
+            await loop.run_in_executor(
+                render_executor,
+                render_page_job,
+                (
+                    base_path,
+                    markdown,
+                    template_path,
+                    block_cache,
+                    None if in_workers else image_sizes,
+                    listing,
+                ),
+            )
+        )
+
+        if error is None:
+            try:
+                await loop.run_in_executor(io_executor, write_page, dest_path, html)
+            except Exception as e:
+                page_template_path = None
+                error = f"{type(e).__name__}: {e}"
+
+        return page_template_path, error, events, stats, page_doc
+
+
+def render_pool(jobs: int, image_sizes: ImageSizes = None) -> Executor:
+    if jobs > 1:
+        try:
+            return ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=start_worker,
+                initargs=(image_sizes, tracing.is_enabled()),
+            )
+        except (NotImplementedError, OSError) as e:
+            print(f"Parallel build unavailable ({e}), rendering on one thread")
+
+    # A single render thread still overlaps with the I/O threads, which
+    # release the GIL while they wait
+    return ThreadPoolExecutor(max_workers=1)
+
+
+def read_source(src_path: str, stream_threshold: int) -> str:
+    with tracing.span("read", src_path=src_path):
+        with open(src_path) as f:
+            if os.fstat(f.fileno()).st_size >= stream_threshold:
+                return None
+            return f.read()
+
+
+def write_page(dest_path: str, html: str):
+    with tracing.span("write", dest_path=dest_path):
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir != "":
+            os.makedirs(dest_dir, exist_ok=True)
+
+        with open(dest_path, "w+") as f:
+            f.write(html)
@@ -0,0 +1,3 @@
+from bench.adversarial import run_adversarial, slow_cases
+from bench.corpus import generate_markdown, generate_site
+from bench.stages import run_stages
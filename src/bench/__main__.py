@@ -0,0 +1,143 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+
+from bench.adversarial import MAX_GROWTH, SCALE, run_adversarial, slow_cases
+from bench.corpus import DEFAULT_MIX, generate_site
+from bench.memory import measure_memory
+from bench.stages import run_stages
+
+DEFAULT_TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>"""
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+
+    for pair in text.split(","):
+        block_type, weight = pair.split("=")
+        if block_type not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'Unknown block type "{block_type}"')
+        mix[block_type] = int(weight)
+
+    return mix
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        prog="bench", description="Time each stage of the pipeline on a synthetic site"
+    )
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="block weights, e.g. paragraph=10,code=3",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage")
+    parser.add_argument("--template", help="template file, defaults to a minimal one")
+    parser.add_argument(
+        "--memory", action="store_true", help="also measure bytes per node"
+    )
+    parser.add_argument(
+        "--adversarial",
+        action="store_true",
+        help="time inline parsing on pathological input, fail if it is not linear",
+    )
+    parser.add_argument(
+        "--size", type=int, default=20000, help="characters per adversarial case"
+    )
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    if args.adversarial:
+        return adversarial(args.size, args.repeat)
+
+    template_source = DEFAULT_TEMPLATE
+    if args.template is not None:
+        with open(args.template) as f:
+            template_source = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate_site(tmp, args.pages, args.blocks, args.seed, args.mix)
+        results = run_stages(paths, template_source, args.repeat)
+
+        if args.memory:
+            markdowns = []
+            for path in paths:
+                with open(path) as f:
+                    markdowns.append(f.read())
+
+            paragraphs = [
+                block
+                for markdown in markdowns
+                for block in markdown.split("\n\n")
+                if block[0].isalpha()
+            ]
+            results["memory"] = measure_memory(markdowns, paragraphs)
+
+    results["config"] = {
+        "pages": args.pages,
+        "blocks": args.blocks,
+        "seed": args.seed,
+        "mix": args.mix,
+        "repeat": args.repeat,
+    }
+    results["python"] = platform.python_version()
+
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)["stages"]
+
+    print(
+        f"{results['pages']} pages, {results['blocks']} blocks, "
+        f"{results['markdown_bytes']} bytes of markdown"
+    )
+    for stage, seconds in results["stages"].items():
+        line = f"{stage:<24}{seconds * 1000:>10.2f} ms"
+        if stage in baseline and baseline[stage] > 0:
+            line += f"{(seconds / baseline[stage] - 1) * 100:>+10.1f}%"
+        print(line)
+
+    for key, value in results.get("memory", {}).items():
+        print(f"{key:<24}{value:>10.1f}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def adversarial(size: int, repeat: int) -> int:
+    results = run_adversarial(size, repeat)
+
+    print(f"{size} and {size * SCALE} characters, growth over {MAX_GROWTH} fails")
+    for name, result in results.items():
+        print(
+            f"{name:<40}{result['small'] * 1000:>10.2f} ms"
+            f"{result['large'] * 1000:>10.2f} ms{result['growth']:>8.1f}x"
+        )
+
+    slow = slow_cases(results)
+    for name in slow:
+        print(f"Error: {name} grew faster than linear", file=sys.stderr)
+
+    return 1 if len(slow) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
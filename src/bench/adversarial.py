@@ -0,0 +1,66 @@
+from bench.stages import best_time
+from textnode import (
+    TextNode,
+    TextType,
+    split_nodes_delimiter,
+    split_nodes_links,
+    text_to_textnodes,
+)
+
+# Spans that drive a parser which scans ahead from every opener towards
+# quadratic time, each made from about n characters
+ADVERSARIAL_CASES = {
+    "snake_case": lambda n: "snake_case " * (n // 11) + "tail_",
+    "open_brackets": lambda n: "[" * n,
+    "nested_brackets": lambda n: "[" * (n // 2) + "]" * (n // 2),
+    "image_openers": lambda n: "![" * (n // 2),
+    "unclosed_links": lambda n: "[a](b " * (n // 6),
+    "link_list": lambda n: "[a](/b) " * (n // 8),
+    "unclosed_code": lambda n: "`" + "x" * n,
+}
+
+# Parsers run on each case
+ADVERSARIAL_PARSERS = {
+    "text_to_textnodes": text_to_textnodes,
+    "split_nodes_delimiter": lambda text: split_nodes_delimiter(
+        [TextNode(text, TextType.PLAIN)], "_", TextType.ITALIC
+    ),
+    "split_nodes_links": lambda text: split_nodes_links(
+        [TextNode(text, TextType.PLAIN)]
+    ),
+}
+
+# Inputs grow by SCALE between the two runs of a case. Linear time grows
+# the same, quadratic by its square; anything past MAX_GROWTH fails.
+SCALE = 4
+MAX_GROWTH = 8
+# Runs this short are mostly timer noise, they pass whatever their growth
+MIN_TIME = 0.001
+
+
+def run_adversarial(size: int = 20000, repeat: int = 3) -> dict:
+    results = {}
+
+    for case, make_text in ADVERSARIAL_CASES.items():
+        small = make_text(size)
+        large = make_text(size * SCALE)
+
+        for parser, parse in ADVERSARIAL_PARSERS.items():
+            small_time = best_time(lambda: parse(small), repeat)
+            large_time = best_time(lambda: parse(large), repeat)
+
+            results[f"{case}/{parser}"] = {
+                "small": small_time,
+                "large": large_time,
+                "growth": large_time / max(small_time, 1e-9),
+            }
+
+    return results
+
+
+def slow_cases(results: dict) -> list[str]:
+    return [
+        name
+        for name, result in results.items()
+        if result["large"] >= MIN_TIME and result["growth"] > MAX_GROWTH
+    ]
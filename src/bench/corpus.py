@@ -0,0 +1,121 @@
+import os
+import random
+
+WORDS = (
+    "the ring fellowship shire hobbit wizard elf dwarf mountain river road "
+    "forest tower king steward ranger sword shadow light star sea ship song "
+    "tale council journey quest friend enemy battle gate city kingdom age "
+    "ancient hidden silver golden dark bright long short old young wise brave"
+).split()
+
+DEFAULT_MIX = {
+    "paragraph": 10,
+    "heading": 3,
+    "unordered_list": 2,
+    "ordered_list": 1,
+    "quote": 1,
+    "code": 1,
+}
+
+# Chance that a sentence carries each kind of inline markup
+INLINE_MIX = {
+    "bold": 0.15,
+    "italic": 0.15,
+    "code": 0.1,
+    "link": 0.1,
+    "image": 0.03,
+}
+
+
+def generate_sentence(rng: random.Random, words: int = 12) -> str:
+    sentence = [rng.choice(WORDS) for i in range(words)]
+    marked = set()
+
+    for markup, chance in INLINE_MIX.items():
+        if rng.random() >= chance:
+            continue
+
+        # Markup never nests, each word gets at most one
+        i = rng.randrange(len(sentence))
+        if i in marked:
+            continue
+        marked.add(i)
+
+        word = sentence[i]
+        match markup:
+            case "bold":
+                sentence[i] = f"**{word}**"
+            case "italic":
+                sentence[i] = f"_{word}_"
+            case "code":
+                sentence[i] = f"`{word}()`"
+            case "link":
+                sentence[i] = f"[{word}](/{rng.choice(WORDS)}/{word})"
+            case "image":
+                sentence[i] = f"![{word}](/images/{word}.png)"
+
+    sentence[0] = sentence[0].capitalize()
+    return " ".join(sentence) + "."
+
+
+def generate_block(rng: random.Random, block_type: str) -> str:
+    match block_type:
+        case "heading":
+            return "#" * rng.randint(2, 4) + " " + generate_sentence(rng, 4)[:-1]
+        case "unordered_list":
+            items = rng.randint(2, 8)
+            return "\n".join(f"- {generate_sentence(rng, 8)}" for i in range(items))
+        case "ordered_list":
+            items = rng.randint(2, 8)
+            return "\n".join(
+                f"{i + 1}. {generate_sentence(rng, 8)}" for i in range(items)
+            )
+        case "quote":
+            lines = rng.randint(1, 4)
+            return "\n".join(f"> {generate_sentence(rng)}" for i in range(lines))
+        case "code":
+            lines = rng.randint(2, 10)
+            body = "\n".join(
+                f"    {rng.choice(WORDS)} = {rng.choice(WORDS)}({rng.randint(0, 99)})"
+                for i in range(lines)
+            )
+            return f"```\n{body}\n```"
+
+    sentences = rng.randint(2, 6)
+    return " ".join(generate_sentence(rng) for i in range(sentences))
+
+
+def generate_markdown(
+    rng: random.Random, blocks: int = 40, mix: dict[str, int] = None
+) -> str:
+    mix = mix or DEFAULT_MIX
+    block_types = rng.choices(list(mix), weights=list(mix.values()), k=blocks)
+
+    markdown = [f"# {generate_sentence(rng, 5)[:-1]}"]
+    markdown.extend(generate_block(rng, block_type) for block_type in block_types)
+
+    return "\n\n".join(markdown) + "\n"
+
+
+def generate_site(
+    path: str,
+    pages: int = 100,
+    blocks: int = 40,
+    seed: int = 0,
+    mix: dict[str, int] = None,
+) -> list[str]:
+
+    # The same arguments always produce the same site
+    rng = random.Random(seed)
+    paths = []
+
+    for i in range(pages):
+        page_path = os.path.join(path, f"section{i % 10}", f"page{i}", "index.md")
+        os.makedirs(os.path.dirname(page_path), exist_ok=True)
+
+        with open(page_path, "w") as f:
+            f.write(generate_markdown(rng, blocks, mix))
+
+        paths.append(page_path)
+
+    return paths
@@ -0,0 +1,45 @@
+import tracemalloc
+
+from htmlnode import ParentNode
+from markdownblock import markdown_to_html_node
+from textnode import text_to_textnodes
+
+
+def count_nodes(node) -> int:
+    count = 0
+    stack = [node]
+
+    while len(stack) > 0:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, ParentNode):
+            stack.extend(node.children)
+
+    return count
+
+
+def measure_memory(markdowns: list[str], paragraphs: list[str]) -> dict:
+
+    # Trees are kept alive while measuring, so the traced size is what a
+    # build holds for them
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    trees = [markdown_to_html_node(markdown) for markdown in markdowns]
+    tree_bytes = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    text_nodes = [text_to_textnodes(paragraph) for paragraph in paragraphs]
+    text_node_bytes = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    html_nodes = sum(count_nodes(tree) for tree in trees)
+    text_node_count = sum(len(nodes) for nodes in text_nodes)
+
+    return {
+        "html_nodes": html_nodes,
+        "html_bytes_per_node": tree_bytes / max(1, html_nodes),
+        "text_nodes": text_node_count,
+        "text_bytes_per_node": text_node_bytes / max(1, text_node_count),
+    }
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+
+from markdownblock import (
+    HEADING_LEVELS,
+    BlockType,
+    block_to_block_type,
+    extract_title,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    markdown_to_page,
+)
+from template import Template
+from textnode import text_to_textnodes
+
+def best_time(func, repeat: int) -> float:
+    times = []
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def inline_texts(block: str, block_type: BlockType) -> list[str]:
+    # The spans the renderer hands to text_to_textnodes for each block type
+    match block_type:
+        case BlockType.CODE:
+            return []
+        case BlockType.QUOTE:
+            return ["\n".join(line[2:] for line in block.split("\n"))]
+        case BlockType.UNORDERED_LIST:
+            return [line.strip()[2:] for line in block.split("\n")]
+        case BlockType.ORDERED_LIST:
+            return [line.strip()[3:] for line in block.split("\n")]
+        case BlockType.PARAGRAPH:
+            return [block.replace("\n", " ")]
+
+    return [block[HEADING_LEVELS[block_type] :].strip()]
+
+
+def run_stages(paths: list[str], template_source: str, repeat: int = 3) -> dict:
+
+    markdowns = []
+
+    def read():
+        markdowns.clear()
+        for path in paths:
+            with open(path) as f:
+                markdowns.append(f.read())
+
+    # Each stage is timed on the previous stage's output, so they can be
+    # compared on their own
+    stages = {"read": best_time(read, repeat)}
+
+    pages_blocks = [markdown_to_blocks(markdown) for markdown in markdowns]
+    stages["markdown_to_blocks"] = best_time(
+        lambda: [markdown_to_blocks(markdown) for markdown in markdowns], repeat
+    )
+
+    blocks = [block for page_blocks in pages_blocks for block in page_blocks]
+    stages["block_to_block_type"] = best_time(
+        lambda: [block_to_block_type(block) for block in blocks], repeat
+    )
+
+    texts = [
+        text
+        for block in blocks
+        for text in inline_texts(block, block_to_block_type(block))
+    ]
+    stages["text_to_textnodes"] = best_time(
+        lambda: [text_to_textnodes(text) for text in texts], repeat
+    )
+
+    stages["markdown_to_html_node"] = best_time(
+        lambda: [markdown_to_html_node(markdown) for markdown in markdowns], repeat
+    )
+
+    # The same render, gathering the page's title, outline and references
+    stages["markdown_to_page"] = best_time(
+        lambda: [markdown_to_page(markdown) for markdown in markdowns], repeat
+    )
+
+    nodes = [markdown_to_html_node(markdown) for markdown in markdowns]
+    stages["to_html"] = best_time(lambda: [node.to_html() for node in nodes], repeat)
+
+    template = Template(template_source)
+    contents = [(extract_title(node), node.to_html()) for node in nodes]
+    stages["template_fill"] = best_time(
+        lambda: [
+            template.render({"Title": title, "Content": content})
+            for title, content in contents
+        ],
+        repeat,
+    )
+
+    pages = [
+        template.render({"Title": title, "Content": content})
+        for title, content in contents
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+
+        def write():
+            for i, page in enumerate(pages):
+                with open(os.path.join(tmp, f"{i}.html"), "w") as f:
+                    f.write(page)
+
+        stages["write"] = best_time(write, repeat)
+
+    return {
+        "stages": stages,
+        "pages": len(paths),
+        "blocks": len(blocks),
+        "markdown_bytes": sum(len(markdown.encode()) for markdown in markdowns),
+        "html_bytes": sum(len(page.encode()) for page in pages),
+    }
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Bump whenever block rendering changes, older entries then never match
+RENDERER_VERSION = 2
+
+# Bump whenever the table changes, older caches are then dropped
+SCHEMA_VERSION = 3
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# Keeps each query under SQLite's limit on bound parameters
+QUERY_BATCH = 500
+
+
+class BlockCache:
+    def __init__(self, path: str, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._used = []
+        # One connection per thread, SQLite connections can't be shared
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict:
+        # Worker processes open a connection of their own
+        return {"path": self.path, "max_size": self.max_size}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["path"], state["max_size"])
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        directory = os.path.dirname(self.path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+
+        # Parallel workers share the file, WAL lets them read while one writes
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+
+        # Workers open the file at once, only one of them upgrades it
+        connection.execute("BEGIN IMMEDIATE")
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            connection.execute("DROP TABLE IF EXISTS blocks")
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS blocks ("
+            "key TEXT PRIMARY KEY, html TEXT NOT NULL, text TEXT NOT NULL, "
+            "refs TEXT NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        connection.commit()
+
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+    @staticmethod
+    def key(block_type: str, text: str, base_path: str = "/") -> str:
+        # Fragments are stored with their URLs already under the base path
+        digest = hashlib.sha256(
+            f"{RENDERER_VERSION}\0{block_type}\0{base_path}\0".encode()
+        )
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def lookup(
+        self, keys: list[str]
+    ) -> dict[str, tuple[str, str, list[str], list[str]]]:
+        # Each fragment comes with the plain text it shows, for the search
+        # index, and the links and images it holds
+        keys = list(dict.fromkeys(keys))
+        rendered = {}
+
+        for i in range(0, len(keys), QUERY_BATCH):
+            batch = keys[i : i + QUERY_BATCH]
+            rows = self.connection().execute(
+                f"SELECT key, html, text, refs FROM blocks WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            rendered.update(
+                (key, (html, text, *json.loads(refs))) for key, html, text, refs in rows
+            )
+
+        self.hits += len(rendered)
+        self.misses += len(keys) - len(rendered)
+        self._used.extend(rendered)
+
+        return rendered
+
+    def store(self, rendered: dict[str, tuple[str, str, list[str], list[str]]]):
+        # Write new fragments and mark the ones just read as recently used
+        # in a single transaction
+        now = time.time_ns()
+        connection = self.connection()
+
+        rows = []
+        for key, (html, text, links, images) in rendered.items():
+            refs = json.dumps([links, images])
+            rows.append((key, html, text, refs, len(html) + len(text) + len(refs), now))
+
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            connection.executemany(
+                "UPDATE blocks SET last_used = ? WHERE key = ?",
+                [(now, key) for key in self._used],
+            )
+
+        self._used = []
+
+    def evict(self) -> int:
+        # Drop the least recently used fragments until the cache fits
+        connection = self.connection()
+        size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM blocks")
+        excess = size.fetchone()[0] - self.max_size
+        if excess <= 0:
+            return 0
+
+        evicted = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM blocks ORDER BY last_used"
+        ):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+        with connection:
+            connection.executemany("DELETE FROM blocks WHERE key = ?", evicted)
+
+        return len(evicted)
+
+    def take_stats(self) -> tuple[int, int]:
+        # Workers hand their counters back with each page
+        stats = (self.hits, self.misses)
+        self.hits = 0
+        self.misses = 0
+        return stats
+
+    def add_stats(self, stats: tuple[int, int]):
+        self.hits += stats[0]
+        self.misses += stats[1]
+
+    def __repr__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
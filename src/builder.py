@@ -0,0 +1,740 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterator
+
+import tracing
+from assets import sync_dir, sync_file
+from blockcache import DEFAULT_CACHE_SIZE, BlockCache
+from discovery import IGNORE_PATTERNS, PAGE_SUFFIX, discover_pages, is_ignored
+from imagemeta import IMAGE_EXTENSIONS, ImageSizes
+from manifest import Manifest, remove_output, remove_siblings
+from page import STREAM_THRESHOLD, generate_page_job, pool_jobs, start_worker
+from pagemeta import PageIndex, is_draft, is_listing, listing_digest
+from search import SearchIndex
+
+STATIC_PATH = "static/"
+CONTENT_PATH = "content/"
+TEMPLATE_PATH = "template.html"
+PUBLIC_PATH = "docs/"
+CACHE_PATH = ".cache/"
+
+# Pages checked against the manifest and rendered together
+PAGE_BATCH = 4096
+
+
+@dataclass
+class BuildConfig:
+    base_path: str = "/"
+    static_dir: str = STATIC_PATH
+    content_dir: str = CONTENT_PATH
+    template_path: str = TEMPLATE_PATH
+    output_dir: str = PUBLIC_PATH
+    cache_dir: str = CACHE_PATH
+    jobs: int = 1
+    link_assets: bool = False
+    # Bytes, 0 turns the block cache off
+    cache_size: int = DEFAULT_CACHE_SIZE
+    stream_threshold: int = STREAM_THRESHOLD
+    # Pages in flight at once when reads and writes overlap rendering, 0 keeps
+    # them in line with it
+    io_concurrency: int = 0
+    precompress: bool = False
+    # None keeps the defaults in compress.py
+    compress_min_size: int = None
+    gzip_level: int = None
+    brotli_quality: int = None
+    ignore_patterns: tuple[str, ...] = IGNORE_PATTERNS
+    clean: bool = False
+
+    @classmethod
+    def for_site(cls, root: str, **options) -> "BuildConfig":
+        # Inputs, output and caches all in the one site folder
+        if root != "":
+            root = os.path.normpath(root)
+
+        return cls(
+            static_dir=os.path.join(root, STATIC_PATH),
+            content_dir=os.path.join(root, CONTENT_PATH),
+            template_path=os.path.join(root, TEMPLATE_PATH),
+            output_dir=os.path.join(root, PUBLIC_PATH),
+            cache_dir=os.path.join(root, CACHE_PATH),
+            **options,
+        )
+
+    @property
+    def layouts_dir(self) -> str:
+        return os.path.join(os.path.dirname(self.template_path), "layouts/")
+
+    @property
+    def search_dir(self) -> str:
+        return os.path.join(self.output_dir, "search")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, "manifest.json")
+
+    @property
+    def block_cache_path(self) -> str:
+        return os.path.join(self.cache_dir, "blocks.sqlite")
+
+    @property
+    def image_sizes_path(self) -> str:
+        return os.path.join(self.cache_dir, "images.json")
+
+    @property
+    def search_index_path(self) -> str:
+        return os.path.join(self.cache_dir, "search.json")
+
+    @property
+    def page_index_path(self) -> str:
+        return os.path.join(self.cache_dir, "pages.json")
+
+
+@dataclass
+class BuildReport:
+    errors: list[tuple[str, str]] = field(default_factory=list)
+    generated: int = 0
+    # Pages the manifest found up to date
+    skipped: int = 0
+    removed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return len(self.errors) == 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.generated} pages generated, {self.skipped} unchanged, "
+            f"{self.removed} removed, "
+            f"{len(self.errors)} errors in {self.elapsed * 1000:.0f}ms"
+        )
+
+
+def build_site(config: BuildConfig) -> BuildReport:
+    return Builder(config).build()
+
+
+class Builder:
+    def __init__(self, config: BuildConfig) -> None:
+        self.config = config
+        check_paths(config)
+
+        # Clear the output folder, or pick up where the last build left off
+        if config.clean:
+            if os.path.exists(config.output_dir):
+                shutil.rmtree(config.output_dir)
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(config.block_cache_path + suffix):
+                    os.remove(config.block_cache_path + suffix)
+            self.manifest = Manifest(config.manifest_path, config.output_dir)
+        else:
+            self.manifest = Manifest.load(config.manifest_path, config.output_dir)
+
+        # Loaded once, kept warm across builds by long-running callers
+        self.block_cache = None
+        if config.cache_size > 0:
+            self.block_cache = BlockCache(config.block_cache_path, config.cache_size)
+        self.image_sizes = ImageSizes.load(config.image_sizes_path, config.static_dir)
+        self.search_index = SearchIndex.load(
+            config.search_index_path, config.search_dir
+        )
+        self.page_index = PageIndex.load(config.page_index_path)
+
+    def build(self) -> BuildReport:
+        config = self.config
+        manifest = self.manifest
+        report = BuildReport()
+        start = time.perf_counter()
+
+        manifest.start_build()
+
+        # The output folder may be nested in folders that don't exist yet
+        os.makedirs(config.output_dir, exist_ok=True)
+
+        # Pages are rendered with the sizes of the images they show
+        with tracing.span("refresh image sizes"):
+            read = self.image_sizes.refresh()
+        print(f"Image sizes: {self.image_sizes}, {read} read")
+
+        compressor = self.open_compressor()
+
+        # Populate the output folder, in the background while pages render
+        # when the build overlaps its I/O
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            synced = executor.submit(sync_static, config, manifest)
+            if config.io_concurrency <= 0:
+                synced.result()
+
+            report.errors = generate_pages_recursive(
+                config.base_path,
+                config.content_dir,
+                config.template_path,
+                config.output_dir,
+                manifest,
+                config.jobs,
+                self.block_cache,
+                config.stream_threshold,
+                config.io_concurrency,
+                compressor,
+                self.image_sizes,
+                self.search_index,
+                config.ignore_patterns,
+                report,
+                self.page_index,
+            )
+
+            synced.result()
+
+        if self.block_cache is not None:
+            with tracing.span("evict block cache"):
+                self.block_cache.evict()
+            print(f"Block cache: {self.block_cache}")
+            self.block_cache.take_stats()
+
+        with tracing.span("prune manifest"):
+            for dest_path in manifest.prune():
+                print(f"Removed {dest_path}, its source no longer exists or is a draft")
+                report.removed += 1
+
+        with tracing.span("write search index"):
+            self.search_index.retain(manifest.pages.keys())
+            search_report = self.search_index.write()
+            print(f"Search index: {self.search_index}, {search_report}")
+
+        if compressor is not None:
+            # Pages that did not need rebuilding and static files, unchanged
+            # ones are skipped without being read
+            for entry in manifest.pages.values():
+                compressor.submit(entry["dest"])
+            for dest_path in manifest.assets:
+                compressor.submit(dest_path)
+
+            with tracing.span("compress"):
+                print(f"Compressed outputs: {compressor.wait()}")
+        else:
+            self.drop_compressed()
+
+        with tracing.span("save manifest"):
+            self.save()
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def apply_paths(self, paths: list[str]) -> BuildReport:
+        # Files or folders that changed or are gone, as the daemon hears of them
+        return self.apply_changes(
+            *expand_paths(
+                [self.site_path(path) for path in paths],
+                self.manifest.pages,
+                self.manifest.assets,
+            )
+        )
+
+    def apply_changes(self, changed: list[str], removed: list[str]) -> BuildReport:
+        config = self.config
+        manifest = self.manifest
+        report = BuildReport()
+        start = time.perf_counter()
+
+        changed = [self.site_path(path) for path in changed]
+        removed = [self.site_path(path) for path in removed]
+
+        manifest.start_build()
+
+        # Outputs rewritten here get their compressed siblings made again
+        compressor = self.open_compressor()
+        if compressor is None:
+            self.drop_compressed()
+
+        # A new template or layout may touch every page, the manifest finds
+        # which
+        if config.template_path in changed or any(
+            path.startswith(config.layouts_dir) for path in changed + removed
+        ):
+            report.errors = self.generate_pages(report, compressor)
+            return self.finish_changes(report, compressor, start)
+
+        for path in removed:
+            if path.startswith(config.static_dir):
+                dest_path = os.path.join(
+                    config.output_dir, os.path.relpath(path, config.static_dir)
+                )
+                manifest.assets.pop(dest_path, None)
+                remove_output(dest_path, config.output_dir)
+            elif path in manifest.pages:
+                manifest.remove(path)
+                self.search_index.remove(path)
+                report.removed += 1
+
+            # Drafts were never built, but are indexed all the same
+            self.page_index.remove(path)
+
+        changed_pages = []
+        for path in changed:
+            if path.startswith(config.static_dir):
+                dest_path = os.path.join(
+                    config.output_dir, os.path.relpath(path, config.static_dir)
+                )
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                sync_file(path, dest_path)
+                manifest.assets[dest_path] = path
+                if compressor is not None:
+                    compressor.submit(dest_path)
+            elif path.endswith(PAGE_SUFFIX) and not is_ignored(
+                path, config.content_dir, config.ignore_patterns
+            ):
+                changed_pages.append(path)
+
+        # Every changed page is indexed before any listing is rendered from
+        # the index, and listing pages are rendered after the rest
+        for path in changed_pages:
+            self.page_index.refresh(
+                path, page_url("/", self.dest_path(path), config.output_dir)
+            )
+        for path in changed_pages:
+            if not is_listing(self.page_index.pages[path]["meta"]):
+                self.generate_page(path, self.dest_path(path), report, compressor)
+
+        # Listing pages showing a page that changed, came or went are stale,
+        # the manifest finds which
+        if len(changed_pages) > 0 or any(
+            path.startswith(config.content_dir) and path.endswith(PAGE_SUFFIX)
+            for path in removed
+        ):
+            for src_path, entry in list(self.page_index.pages.items()):
+                meta = entry["meta"]
+                if not is_listing(meta):
+                    continue
+                if src_path in changed_pages:
+                    self.generate_page(
+                        src_path, self.dest_path(src_path), report, compressor
+                    )
+                    continue
+                if is_draft(meta):
+                    continue
+
+                listing = self.page_index.listing_of(src_path, config.content_dir)
+                dest_path = self.dest_path(src_path)
+                if manifest.is_stale(
+                    config.base_path,
+                    src_path,
+                    config.template_path,
+                    dest_path,
+                    self.image_sizes,
+                    listing_digest(listing),
+                ):
+                    self.generate_page(src_path, dest_path, report, compressor)
+                else:
+                    report.skipped += 1
+
+        # Pages showing an image that changed size are stale, the manifest
+        # finds which
+        if any(
+            path.startswith(config.static_dir)
+            and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+            for path in changed + removed
+        ):
+            self.image_sizes.refresh()
+            report.errors.extend(self.generate_pages(report, compressor))
+
+        return self.finish_changes(report, compressor, start)
+
+    def finish_changes(
+        self, report: BuildReport, compressor, start: float
+    ) -> BuildReport:
+        if compressor is not None:
+            print(f"Compressed outputs: {compressor.wait()}")
+
+        self.save()
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def site_path(self, path: str) -> str:
+        # Paths are matched against the config's folders and the manifest's
+        # keys, so they take the same form, absolute or relative to the
+        # working directory
+        if os.path.isabs(self.config.content_dir):
+            return os.path.abspath(path)
+        return os.path.relpath(path)
+
+    def dest_path(self, src_path: str) -> str:
+        dest_path = os.path.join(
+            self.config.output_dir, os.path.relpath(src_path, self.config.content_dir)
+        )
+        return dest_path[: -len(PAGE_SUFFIX)] + ".html"
+
+    def generate_page(
+        self, src_path: str, dest_path: str, report: BuildReport, compressor=None
+    ):
+        config = self.config
+
+        entry = self.page_index.refresh(
+            src_path, page_url("/", dest_path, config.output_dir)
+        )
+        if is_draft(entry["meta"]):
+            # A page turned back into a draft is taken down
+            if src_path in self.manifest.pages:
+                self.manifest.remove(src_path)
+                self.search_index.remove(src_path)
+                report.removed += 1
+            return
+
+        listing = None
+        if is_listing(entry["meta"]):
+            listing = self.page_index.listing_of(src_path, config.content_dir)
+
+        page_template_path, error, events, _, page_doc = generate_page_job(
+            (
+                config.base_path,
+                src_path,
+                config.template_path,
+                dest_path,
+                self.block_cache,
+                config.stream_threshold,
+                self.image_sizes,
+                listing,
+            )
+        )
+
+        if error is not None:
+            report.errors.append((src_path, error))
+            return
+
+        print(
+            f"Generated page from {src_path} to {dest_path} using {page_template_path}"
+        )
+        report.generated += 1
+        self.manifest.record(
+            config.base_path,
+            src_path,
+            page_template_path,
+            dest_path,
+            self.image_sizes,
+            listing_digest(listing) if listing is not None else None,
+            page_doc["images"],
+        )
+        self.search_index.update(
+            src_path,
+            page_url(config.base_path, dest_path, config.output_dir),
+            page_doc["title"],
+            page_doc["terms"],
+        )
+
+        if compressor is not None:
+            compressor.submit(dest_path)
+
+    def generate_pages(
+        self, report: BuildReport, compressor=None
+    ) -> list[tuple[str, str]]:
+        config = self.config
+        return generate_pages_recursive(
+            config.base_path,
+            config.content_dir,
+            config.template_path,
+            config.output_dir,
+            self.manifest,
+            block_cache=self.block_cache,
+            compressor=compressor,
+            stream_threshold=config.stream_threshold,
+            image_sizes=self.image_sizes,
+            search_index=self.search_index,
+            ignore_patterns=config.ignore_patterns,
+            report=report,
+            page_index=self.page_index,
+        )
+
+    def open_compressor(self):
+        if not self.config.precompress:
+            return None
+
+        # Only builds that compress pay for loading gzip and brotli
+        from compress import Compressor
+
+        options = {
+            "min_size": self.config.compress_min_size,
+            "gzip_level": self.config.gzip_level,
+            "brotli_quality": self.config.brotli_quality,
+        }
+        return Compressor(
+            self.manifest.compressed,
+            **{name: value for name, value in options.items() if value is not None},
+        )
+
+    def drop_compressed(self):
+        # Compression was turned off, leftover copies would go stale
+        for dest_path in self.manifest.compressed:
+            remove_siblings(dest_path)
+        self.manifest.compressed.clear()
+
+    def save(self):
+        self.search_index.write()
+        self.manifest.save()
+        self.image_sizes.save()
+        self.search_index.save()
+        self.page_index.save()
+
+
+def check_paths(config: BuildConfig):
+    if not os.path.exists(config.static_dir):
+        raise Exception(f'The static folder doesn\'t exist. "{config.static_dir}"')
+    if not os.path.exists(config.content_dir):
+        raise Exception(f'The content folder doesn\'t exist. "{config.content_dir}"')
+    if not os.path.exists(config.template_path):
+        raise Exception(f'The HTML template is missing. "{config.template_path}"')
+
+
+def expand_paths(
+    paths: list[str], pages: dict[str, dict], assets: dict[str, str]
+) -> tuple[list[str], list[str]]:
+    changed = []
+    removed = []
+
+    for path in paths:
+        path = path.rstrip("/")
+
+        if os.path.isdir(path):
+            for dir_path, _, file_names in os.walk(path):
+                changed.extend(os.path.join(dir_path, name) for name in file_names)
+        elif os.path.exists(path):
+            changed.append(path)
+        else:
+            # A removed folder takes every page and static file under it along
+            prefix = path + "/"
+            removed.append(path)
+            removed.extend(src for src in pages if src.startswith(prefix))
+            removed.extend(src for src in assets.values() if src.startswith(prefix))
+
+    return changed, removed
+
+
+def sync_static(config: BuildConfig, manifest: Manifest):
+    with tracing.span("sync_dir"):
+        report = sync_dir(
+            config.static_dir, config.output_dir, manifest.assets, config.link_assets
+        )
+    print(f"Synced static files: {report}")
+
+
+def page_url(base_path: str, dest_path: str, output_dir: str = PUBLIC_PATH) -> str:
+    url = os.path.relpath(dest_path, output_dir).replace(os.sep, "/")
+    if url == "index.html" or url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return base_path + url
+
+
+def generate_pages_recursive(
+    base_path: str,
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    manifest: Manifest = None,
+    jobs: int = 1,
+    block_cache: BlockCache = None,
+    stream_threshold: int = STREAM_THRESHOLD,
+    io_concurrency: int = 0,
+    compressor=None,
+    image_sizes: ImageSizes = None,
+    search_index: SearchIndex = None,
+    ignore_patterns: tuple[str, ...] = IGNORE_PATTERNS,
+    report: BuildReport = None,
+    page_index: PageIndex = None,
+) -> list[tuple[str, str]]:
+
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    errors = []
+
+    def generate(batch: list[tuple[str, str]], listings: dict[str, list[dict]]):
+        digests = {
+            src_path: listing_digest(listing) for src_path, listing in listings.items()
+        }
+
+        # Only re-render pages whose inputs changed since the last build
+        if manifest is not None:
+            with tracing.span("check manifest"):
+                with ThreadPoolExecutor(max_workers=max(1, io_concurrency)) as executor:
+                    stale = executor.map(
+                        lambda page: manifest.is_stale(
+                            base_path,
+                            page[0],
+                            template_path,
+                            page[1],
+                            image_sizes,
+                            digests.get(page[0]),
+                        ),
+                        batch,
+                    )
+                    checked = len(batch)
+                    batch = [page for page, is_stale in zip(batch, stale) if is_stale]
+                    if report is not None:
+                        report.skipped += checked - len(batch)
+
+        jobs_args = [
+            (
+                base_path,
+                src_path,
+                template_path,
+                dest_path,
+                block_cache,
+                stream_threshold,
+                image_sizes,
+                listings.get(src_path),
+            )
+            for src_path, dest_path in batch
+        ]
+
+        if io_concurrency > 0:
+            # asyncio is only loaded by builds that overlap their I/O
+            from asyncbuild import render_pages_async
+
+            results = render_pages_async(jobs_args, jobs, io_concurrency)
+        else:
+            results = render_pages(jobs_args, jobs)
+
+        generated = []
+        for (src_path, dest_path), result in zip(batch, results):
+            page_template_path, error, events, stats, page_doc = result
+            tracing.add_events(events)
+            if block_cache is not None and stats is not None:
+                block_cache.add_stats(stats)
+
+            if error is not None:
+                errors.append((src_path, error))
+                continue
+
+            print(
+                f"Generated page from {src_path} to {dest_path} using {page_template_path}"
+            )
+            generated.append(
+                (src_path, page_template_path, dest_path, page_doc["images"])
+            )
+
+            if search_index is not None:
+                search_index.update(
+                    src_path,
+                    page_url(base_path, dest_path, dest_dir_path),
+                    page_doc["title"],
+                    page_doc["terms"],
+                )
+
+            # Compress in the background while the next pages render
+            if compressor is not None:
+                compressor.submit(dest_path)
+
+        if report is not None:
+            report.generated += len(generated)
+
+        # Recording hashes and stats every source, spread over the I/O threads too
+        if manifest is not None:
+            with tracing.span("record manifest"):
+                with ThreadPoolExecutor(max_workers=max(1, io_concurrency)) as executor:
+                    for _ in executor.map(
+                        lambda page: manifest.record(
+                            base_path,
+                            *page[:3],
+                            image_sizes,
+                            digests.get(page[0]),
+                            page[3],
+                        ),
+                        generated,
+                    ):
+                        pass
+
+    pages = discover_pages(dir_path_content, dest_dir_path, ignore_patterns)
+    if page_index is not None:
+        page_index.start_build()
+
+    # Pages are found, checked and rendered a batch at a time, so a huge
+    # content tree is never listed in memory as a whole
+    listing_pages = []
+    while True:
+        with tracing.span("discover_pages"):
+            batch = list(islice(pages, PAGE_BATCH))
+        if len(batch) == 0:
+            break
+
+        if page_index is not None:
+            with tracing.span("index pages"):
+                batch, listed = index_pages(batch, page_index, dest_dir_path)
+            listing_pages.extend(listed)
+
+        generate(batch, {})
+
+    # Listing pages go last, once every page they could list is indexed and
+    # pages deleted or now ignored are out of the index
+    if page_index is not None:
+        page_index.prune()
+
+    if len(listing_pages) > 0:
+        generate(
+            listing_pages,
+            {
+                src_path: page_index.listing_of(src_path, dir_path_content)
+                for src_path, _ in listing_pages
+            },
+        )
+
+    return errors
+
+
+def index_pages(
+    batch: list[tuple[str, str]], page_index: PageIndex, output_dir: str
+) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+
+    # Only the front matter of new or changed pages is read. Drafts are left
+    # out of the build, and listing pages are set apart.
+    pages = []
+    listing_pages = []
+
+    for src_path, dest_path in batch:
+        entry = page_index.refresh(src_path, page_url("/", dest_path, output_dir))
+        if is_draft(entry["meta"]):
+            continue
+
+        if is_listing(entry["meta"]):
+            listing_pages.append((src_path, dest_path))
+        else:
+            pages.append((src_path, dest_path))
+
+    return pages, listing_pages
+
+
+def render_pages(jobs_args: list[tuple], jobs: int) -> Iterator[tuple]:
+
+    # Results are handed over as pages finish, so their outputs can be
+    # compressed while the rest still render
+    if jobs > 1 and len(jobs_args) > 1:
+        # Process pools are only started, and imported, for parallel builds
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = None
+        try:
+            # Image sizes go to each worker once, not pickled with every page
+            image_sizes, pool_args = pool_jobs(jobs_args, 6)
+            executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=start_worker,
+                initargs=(image_sizes, tracing.is_enabled()),
+            )
+
+            # map submits every page up front, starting the workers
+            chunksize = max(1, len(pool_args) // (jobs * 4))
+            results = executor.map(generate_page_job, pool_args, chunksize=chunksize)
+        except (NotImplementedError, OSError) as e:
+            # Platforms without working process pools still get a build
+            print(f"Parallel build unavailable ({e}), rendering serially")
+            if executor is not None:
+                executor.shutdown()
+        else:
+            with executor:
+                yield from results
+            return
+
+    for job_args in jobs_args:
+        yield generate_page_job(job_args)
@@ -0,0 +1,23 @@
+import os
+
+
+def save_text(path: str, data: str) -> bool:
+    # A build that changed nothing leaves its cache files alone, replacing
+    # one is slow on some filesystems even when the bytes are the same
+    try:
+        with open(path) as f:
+            if f.read() == data:
+                return False
+    except (OSError, ValueError):
+        pass
+
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+from assets import format_size
+from manifest import remove_siblings
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional, without it only .gz files are written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".svg", ".json", ".xml"}
+
+MIN_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+class CompressReport:
+    def __init__(self) -> None:
+        self.compressed = 0
+        self.unchanged = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.compressed} compressed "
+            f"({format_size(self.bytes_in)} to {format_size(self.bytes_out)}), "
+            f"{self.unchanged} unchanged"
+        )
+
+
+class Compressor:
+    def __init__(
+        self,
+        compressed: dict[str, dict],
+        min_size: int = MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        threads: int = None,
+    ) -> None:
+        # compressed maps each output to the bytes its siblings were made
+        # from, it is kept in the manifest between builds
+        self.compressed = compressed
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.levels = f"gzip {gzip_level}, brotli {brotli_quality if brotli else None}"
+
+        # zlib and brotli let go of the GIL, so threads compress in parallel
+        self.executor = ThreadPoolExecutor(max_workers=threads or os.cpu_count() or 1)
+        self.futures = []
+        self.submitted = set()
+
+    def submit(self, path: str):
+        if path in self.submitted:
+            return
+
+        if os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS:
+            self.submitted.add(path)
+            self.futures.append((path, self.executor.submit(self.compress, path)))
+
+    def wait(self) -> CompressReport:
+        report = CompressReport()
+
+        for path, future in self.futures:
+            try:
+                sizes = future.result()
+            except FileNotFoundError:
+                # Removed before it was compressed, by a page taken down in
+                # the same watch cycle, say. Siblings written meanwhile go too.
+                if not os.path.exists(path):
+                    remove_siblings(path)
+                continue
+
+            if sizes is None:
+                report.unchanged += 1
+            else:
+                report.compressed += 1
+                report.bytes_in += sizes[0]
+                report.bytes_out += sizes[1]
+
+        self.executor.shutdown()
+        self.futures = []
+        self.submitted = set()
+
+        # Forget outputs that were removed since
+        for path in list(self.compressed):
+            if not os.path.exists(path):
+                del self.compressed[path]
+
+        return report
+
+    def compress(self, path: str) -> tuple[int, int]:
+        stat = os.stat(path)
+        entry = self.compressed.get(path)
+
+        if (
+            entry is not None
+            and entry["mtime"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+            and entry["levels"] == self.levels
+            and self.has_siblings(path)
+        ):
+            return None
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if len(data) < self.min_size:
+            # Too small to be worth it, drop siblings left from a bigger version
+            remove_siblings(path)
+            self.compressed.pop(path, None)
+            return None
+
+        # Rewritten pages often come out byte for byte the same
+        digest = hashlib.sha256(data).hexdigest()
+        if (
+            entry is not None
+            and entry["hash"] == digest
+            and entry["levels"] == self.levels
+            and self.has_siblings(path)
+        ):
+            entry["mtime"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            return None
+
+        with tracing.span("compress", path=path):
+            size = write_sibling(
+                path + ".gz",
+                gzip.compress(data, compresslevel=self.gzip_level, mtime=0),
+            )
+            if brotli is not None:
+                write_sibling(
+                    path + ".br", brotli.compress(data, quality=self.brotli_quality)
+                )
+
+        self.compressed[path] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": digest,
+            "levels": self.levels,
+        }
+
+        return len(data), size
+
+    def has_siblings(self, path: str) -> bool:
+        if brotli is not None and not os.path.exists(path + ".br"):
+            return False
+        return os.path.exists(path + ".gz")
+
+
+def write_sibling(path: str, data: bytes) -> int:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp_path, path)
+    return len(data)
@@ -0,0 +1,148 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable
+
+from builder import BuildReport
+
+DAEMON_SOCKET_PATH = ".cache/daemon.sock"
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if line.strip() == b"":
+            # A client checking whether the daemon is alive, it waits for nothing
+            return
+
+        try:
+            request = json.loads(line)
+            response = self.server.handle_build_request(request)
+        except Exception as e:
+            response = {"ok": False, "message": f"{type(e).__name__}: {e}"}
+
+        try:
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, the build itself still counts
+            pass
+
+
+class BuildDaemon(socketserver.UnixStreamServer):
+    def __init__(
+        self,
+        socket_path: str,
+        on_build: Callable[[], BuildReport],
+        on_rebuild: Callable[[list[str]], BuildReport],
+    ) -> None:
+        self.socket_path = socket_path
+        self.on_build = on_build
+        self.on_rebuild = on_rebuild
+        self.builds = 0
+        self.started = time.time()
+
+        remove_stale_socket(socket_path)
+        # Requests are handled one at a time, so builds never overlap
+        super().__init__(socket_path, BuildRequestHandler)
+
+    def handle_build_request(self, request: dict) -> dict:
+        match request.get("command"):
+            case "build":
+                return self.run_build(self.on_build)
+            case "rebuild":
+                # Paths come in absolute, the builder puts them in the form
+                # its site folders take
+                return self.run_build(lambda: self.on_rebuild(request["paths"]))
+            case "status":
+                return {
+                    "ok": True,
+                    "message": f"{self.builds} builds in "
+                    f"{time.time() - self.started:.0f}s, pid {os.getpid()}",
+                }
+            case "stop":
+                # shutdown waits for this request to finish, so it can't be
+                # called from here
+                threading.Thread(target=self.shutdown).start()
+                return {"ok": True, "message": "Stopping"}
+
+        raise Exception(f'Error: Unknown daemon command "{request.get("command")}"')
+
+    def run_build(self, build: Callable[[], BuildReport]) -> dict:
+        start = time.perf_counter()
+
+        # The client gets the build's output instead of the daemon's terminal
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            report = build()
+
+        self.builds += 1
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Build {self.builds} took {elapsed:.0f}ms, {len(report.errors)} errors")
+
+        return {
+            "ok": report.ok,
+            "log": log.getvalue(),
+            "errors": report.errors,
+            "report": {
+                "generated": report.generated,
+                "skipped": report.skipped,
+                "removed": report.removed,
+            },
+            "message": f"Built in {elapsed:.0f}ms, {report.generated} pages "
+            f"generated, {report.skipped} unchanged, {report.removed} removed",
+        }
+
+
+def remove_stale_socket(socket_path: str):
+    if not os.path.exists(socket_path):
+        directory = os.path.dirname(socket_path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        return
+
+    # A socket nobody answers on was left by a daemon that died
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+    except ConnectionRefusedError:
+        os.remove(socket_path)
+        return
+
+    raise Exception(f'Error: A build daemon is already listening on "{socket_path}"')
+
+
+def serve_daemon(
+    socket_path: str,
+    on_build: Callable[[], BuildReport],
+    on_rebuild: Callable[[list[str]], BuildReport],
+):
+    daemon = BuildDaemon(socket_path, on_build, on_rebuild)
+    print(f"Build daemon listening on {socket_path}")
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        os.remove(socket_path)
+
+
+def send_request(socket_path: str, request: dict) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            raise Exception(
+                f'Error: No build daemon is listening on "{socket_path}", '
+                "start one with main.py daemon"
+            )
+
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("rb") as response:
+            return json.loads(response.readline())
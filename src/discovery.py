@@ -0,0 +1,76 @@
+import os
+import re
+from fnmatch import translate
+from typing import Iterator
+
+PAGE_SUFFIX = ".md"
+
+# Hidden files and folders, editor swap files or a .git folder, never hold pages
+IGNORE_PATTERNS = (".*",)
+
+
+def ignore_matcher(patterns: tuple[str, ...]) -> re.Pattern:
+    # Patterns match a name or a path under the content folder, like
+    # "drafts" or "blog/*.draft.md"
+    if len(patterns) == 0:
+        return None
+    return re.compile("|".join(translate(pattern) for pattern in patterns))
+
+
+def is_ignored(
+    path: str, content_dir: str, patterns: tuple[str, ...] = IGNORE_PATTERNS
+) -> bool:
+    matcher = ignore_matcher(patterns)
+    if matcher is None:
+        return False
+
+    relative_path = os.path.relpath(path, content_dir).replace(os.sep, "/")
+    parts = relative_path.split("/")
+
+    # A path is ignored along with any folder above it
+    return any(
+        matches(matcher, parts[i], "/".join(parts[: i + 1])) for i in range(len(parts))
+    )
+
+
+def matches(matcher: re.Pattern, name: str, relative_path: str) -> bool:
+    return matcher.match(name) is not None or matcher.match(relative_path) is not None
+
+
+def discover_pages(
+    content_dir: str,
+    dest_dir: str,
+    ignore_patterns: tuple[str, ...] = IGNORE_PATTERNS,
+) -> Iterator[tuple[str, str]]:
+
+    matcher = ignore_matcher(ignore_patterns)
+
+    # Depth first in name order, with a stack of folders instead of
+    # recursion. Only the folders on the current path are held in memory, and
+    # scandir's entries know whether they are folders without another stat.
+    stack = [(iter(scan_sorted(content_dir)), dest_dir, "")]
+    while len(stack) > 0:
+        entries, dest_dir, relative_dir = stack[-1]
+
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        relative_path = relative_dir + entry.name
+        if matcher is not None and matches(matcher, entry.name, relative_path):
+            continue
+
+        dest_path = os.path.join(dest_dir, entry.name)
+
+        if entry.is_dir():
+            stack.append(
+                (iter(scan_sorted(entry.path)), dest_path, relative_path + "/")
+            )
+        elif entry.name.endswith(PAGE_SUFFIX) and entry.is_file():
+            yield entry.path, dest_path[: -len(PAGE_SUFFIX)] + ".html"
+
+
+def scan_sorted(path: str) -> list[os.DirEntry]:
+    with os.scandir(path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
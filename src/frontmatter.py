@@ -0,0 +1,86 @@
+from itertools import chain
+from typing import Iterable, Iterator
+
+FRONT_MATTER_FENCE = "---"
+
+
+def split_front_matter(markdown: str) -> tuple[dict[str, str | list[str]], str]:
+
+    if not markdown.startswith(FRONT_MATTER_FENCE):
+        return {}, markdown
+
+    lines = markdown.split("\n")
+    if lines[0].strip() != FRONT_MATTER_FENCE:
+        return {}, markdown
+
+    for end in range(1, len(lines)):
+        if lines[end].strip() == FRONT_MATTER_FENCE:
+            break
+    else:
+        # Without a closing fence the dashes are just part of the page
+        return {}, markdown
+
+    return parse_front_matter(lines[1:end]), "\n".join(lines[end + 1 :])
+
+
+def read_front_matter(
+    lines: Iterable[str],
+) -> tuple[dict[str, str | list[str]], Iterator[str]]:
+
+    # The same as split_front_matter, for pages read a line at a time
+    lines = iter(lines)
+    first_line = next(lines, "")
+
+    if (
+        not first_line.startswith(FRONT_MATTER_FENCE)
+        or first_line.strip() != FRONT_MATTER_FENCE
+    ):
+        return {}, chain([first_line], lines)
+
+    header = []
+    for line in lines:
+        if line.strip() == FRONT_MATTER_FENCE:
+            return parse_front_matter(header), lines
+        header.append(line)
+
+    return {}, chain([first_line], header)
+
+
+def parse_front_matter(lines: list[str]) -> dict[str, str | list[str]]:
+
+    # A small part of YAML: "key: value" pairs, lists written inline as
+    # [a, b] or as "- item" lines under a key left empty
+    front_matter = {}
+    key = None
+    for line in lines:
+        line = line.strip()
+        if len(line) == 0 or line[0] == "#":
+            continue
+
+        if line.startswith("- ") and key is not None:
+            items = front_matter[key]
+            if items == "":
+                items = front_matter[key] = []
+            if isinstance(items, list):
+                items.append(parse_scalar(line[2:]))
+                continue
+
+        if ":" not in line:
+            continue
+
+        key, value = line.split(":", 1)
+        key = key.strip()
+        value = value.strip()
+
+        if value.startswith("[") and value.endswith("]"):
+            front_matter[key] = [
+                parse_scalar(item) for item in value[1:-1].split(",") if item.strip()
+            ]
+        else:
+            front_matter[key] = parse_scalar(value)
+
+    return front_matter
+
+
+def parse_scalar(value: str) -> str:
+    return value.strip().strip("\"'")
@@ -1,86 +1,226 @@
+from sys import intern
+from types import MappingProxyType
+from typing import Callable, Iterator, TextIO
+
+# Shared by every leaf, nothing is ever added to a leaf's children
+NO_CHILDREN = ()
+
+# What nodes without props report, shared and read-only like every props view
+EMPTY_PROPS = MappingProxyType({})
+
+# Props holding a URL, passed through the rewriter while rendering
+URL_PROPS = frozenset(["href", "src"])
+
+
 class HTMLNode:
+    # Slots instead of a per-node __dict__, props kept as a tuple of
+    # (key, value) pairs or None when empty
+    __slots__ = ("tag", "value", "children", "_props")
+
     def __init__(
         self,
         tag: str = "",
         value: str = "",
-        childen: list["HTMLNode"] = [],
-        props: dict = {},
+        childen: list["HTMLNode"] = None,
+        props: dict = None,
     ) -> None:
-        self.tag = tag
+        self.tag = intern(tag) if type(tag) is str else tag
         self.value = value
-        self.children = childen
+        self.children = childen if childen is not None else []
         self.props = props
 
-    def to_html(self) -> str:
+    @property
+    def props(self) -> MappingProxyType:
+        # A read-only view, so changing it raises instead of quietly doing
+        # nothing. Props are changed by assigning a new dict.
+        if self._props is None:
+            return EMPTY_PROPS
+        return MappingProxyType(dict(self._props))
+
+    @props.setter
+    def props(self, props: dict):
+        self._props = tuple(props.items()) if props else None
+
+    def to_html(self, rewrite_url: Callable[[str], str] = None) -> str:
+        return "".join(self.to_html_chunks(rewrite_url))
+
+    def to_html_chunks(self, rewrite_url: Callable[[str], str] = None) -> Iterator[str]:
         raise NotImplementedError
 
-    def props_to_html(self) -> str:
+    def write_html(self, fp: TextIO, rewrite_url: Callable[[str], str] = None):
+        fp.writelines(self.to_html_chunks(rewrite_url))
+
+    def props_to_html(self, rewrite_url: Callable[[str], str] = None) -> str:
         html = ""
 
-        if self.props is not None:
-            for key in self.props:
-                html += f' {key}="{self.props[key]}"'
+        if self._props is not None:
+            for key, value in self._props:
+                if rewrite_url is not None and key in URL_PROPS:
+                    value = rewrite_url(value)
+                html += f' {key}="{value}"'
 
         return html
 
-    def tag_to_html(self, close: bool = False) -> str:
+    def tag_to_html(
+        self, close: bool = False, rewrite_url: Callable[[str], str] = None
+    ) -> str:
         html = ""
 
         if self.tag != "":
             if close:
                 html = f"</{self.tag}>"
             else:
-                html = f"<{self.tag}{self.props_to_html()}>"
+                html = f"<{self.tag}{self.props_to_html(rewrite_url)}>"
 
         # print(f'\nTag: {self.tag}\nClose: {close}\nHTML: {html}')
 
         return html
 
     def __repr__(self) -> str:
-        return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
+        return (
+            f"HTMLNode({self.tag}, {self.value}, {self.children}, {dict(self.props)})"
+        )
 
 
 class LeafNode(HTMLNode):
-    def __init__(self, tag: str, value: str, props: dict = {}) -> None:
+    __slots__ = ()
+
+    def __init__(self, tag: str, value: str, props: dict = None) -> None:
         if value is None:
             raise ValueError("Value can't be None")
 
-        super().__init__(tag, value, [], props)
+        super().__init__(tag, value, NO_CHILDREN, props)
 
-    def to_html(self):
+    def to_html(self, rewrite_url: Callable[[str], str] = None):
         if self.value is None:
             raise ValueError(self)
         if self.tag is None:
             return self.value
 
-        return f"{self.tag_to_html()}{self.value}{self.tag_to_html(True)}"
+        return f"{self.tag_to_html(False, rewrite_url)}{self.value}{self.tag_to_html(True)}"
+
+    def to_html_chunks(self, rewrite_url: Callable[[str], str] = None) -> Iterator[str]:
+        yield self.to_html(rewrite_url)
 
 
 class ImageLeafNode(LeafNode):
-    def to_html(self):
+    __slots__ = ()
+
+    def to_html(self, rewrite_url: Callable[[str], str] = None):
         if self.value is None:
             raise ValueError(self)
         if self.tag is None:
             return self.value
 
-        return f"<{self.tag}{self.props_to_html()}/>"
+        return f"<{self.tag}{self.props_to_html(rewrite_url)}/>"
+
+
+class FragmentNode(LeafNode):
+    # Markup rendered earlier, written out as it is, with the text it shows
+    __slots__ = ("text",)
+
+    def __init__(self, html: str, text: str) -> None:
+        super().__init__(None, html)
+        self.text = text
 
 
 class ParentNode(HTMLNode):
-    def __init__(self, tag: str, childen: list[HTMLNode], props: dict = {}) -> None:
+    __slots__ = ()
+
+    def __init__(self, tag: str, childen: list[HTMLNode], props: dict = None) -> None:
         super().__init__(tag, "", childen, props)
 
-    def to_html(self):
+    def check(self):
         if self.tag is None:
             raise ValueError("Parent node missing tag")
         if self.children is None:
             raise ValueError("Parent node's children list is None'")
 
-        html = self.tag_to_html()
-        for child in self.children:
-            html += child.to_html()
-        html += self.tag_to_html(True)
+    def to_html_chunks(self, rewrite_url: Callable[[str], str] = None) -> Iterator[str]:
+        self.check()
+        yield self.tag_to_html(False, rewrite_url)
 
-        # print(f"\n{self}\nHTML: {html}")
+        # An explicit stack keeps deep trees from nesting a generator per level
+        stack = [(self, iter(self.children))]
+        while len(stack) > 0:
+            node, children = stack[-1]
 
-        return html
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child.check()
+                    yield child.tag_to_html(False, rewrite_url)
+                    stack.append((child, iter(child.children)))
+                    break
+
+                yield child.to_html(rewrite_url)
+            else:
+                stack.pop()
+                yield node.tag_to_html(True)
+
+
+def node_text(node: HTMLNode) -> str:
+    # What a reader sees of the node, its leaves' text joined by spaces
+    texts = []
+
+    stack = [node]
+    while len(stack) > 0:
+        node = stack.pop()
+
+        if isinstance(node, FragmentNode):
+            texts.append(node.text)
+        elif isinstance(node, ImageLeafNode):
+            texts.append(node.props.get("alt", ""))
+        elif isinstance(node, ParentNode):
+            stack.extend(reversed(node.children))
+        else:
+            texts.append(node.value)
+
+    return " ".join(texts)
+
+
+def node_refs(node: HTMLNode) -> tuple[str, list[str], list[str]]:
+    # The node's text as node_text gives it, with the links and images it
+    # holds, gathered in the same walk
+    texts = []
+    links = []
+    images = []
+
+    stack = [node]
+    while len(stack) > 0:
+        node = stack.pop()
+        node_type = type(node)
+
+        if node_type is LeafNode:
+            texts.append(node.value)
+            if node.tag == "a":
+                links.append(dict(node._props)["href"])
+        elif node_type is ParentNode:
+            stack.extend(reversed(node.children))
+        elif node_type is ImageLeafNode:
+            props = dict(node._props)
+            texts.append(props.get("alt", ""))
+            images.append(props["src"])
+        elif node_type is FragmentNode:
+            texts.append(node.text)
+        else:
+            texts.append(node_text(node))
+
+    return " ".join(texts), links, images
+
+
+def inline_text(node: HTMLNode) -> str:
+    # The text of an inline run as written, leaves joined with nothing between
+    texts = []
+
+    stack = [node]
+    while len(stack) > 0:
+        node = stack.pop()
+
+        if isinstance(node, FragmentNode):
+            texts.append(node.text)
+        elif isinstance(node, ParentNode):
+            stack.extend(reversed(node.children))
+        elif not isinstance(node, ImageLeafNode):
+            texts.append(node.value)
+
+    return "".join(texts)
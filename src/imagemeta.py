@@ -0,0 +1,153 @@
+import json
+import os
+import struct
+
+from cachefile import save_text
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+# JPEG start-of-frame markers, the ones that carry the image size
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(path: str) -> tuple[int, int]:
+    # Only the header is read, never the pixels
+    with open(path, "rb") as f:
+        head = f.read(32)
+
+        # A truncated header has no size, the image goes out without one
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24]) if len(head) >= 24 else None
+
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10]) if len(head) >= 10 else None
+
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return webp_size(head) if len(head) >= 30 else None
+
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return jpeg_size(f)
+
+    return None
+
+
+def webp_size(head: bytes) -> tuple[int, int]:
+    match head[12:16]:
+        case b"VP8 ":
+            width, height = struct.unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        case b"VP8L":
+            bits = int.from_bytes(head[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        case b"VP8X":
+            return (
+                int.from_bytes(head[24:27], "little") + 1,
+                int.from_bytes(head[27:30], "little") + 1,
+            )
+
+    return None
+
+
+def jpeg_size(f) -> tuple[int, int]:
+    # Walk the segments, skipping each one by its length, until a frame header
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                return None
+
+        if marker[1] == 0xD8 or 0xD0 <= marker[1] <= 0xD7:
+            continue
+
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+
+        if marker[1] in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+class ImageSizes:
+    def __init__(self, path: str, static_dir: str, entries: dict = None) -> None:
+        self.path = path
+        self.static_dir = static_dir
+        # Maps each image under static_dir, by its path there, to its size
+        # and the mtime it was read at
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls, path: str, static_dir: str) -> "ImageSizes":
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            # A missing or corrupt cache only costs reading the headers again
+            entries = {}
+
+        return cls(path, static_dir, entries)
+
+    def save(self):
+        save_text(self.path, json.dumps(self.entries, indent=1))
+
+    def refresh(self) -> int:
+        # Stat every image once per build, headers are only read for new or
+        # changed files. Returns how many were read.
+        read = 0
+        found = set()
+
+        stack = [self.static_dir]
+        while len(stack) > 0:
+            for entry in os.scandir(stack.pop()):
+                if entry.is_dir():
+                    stack.append(entry.path)
+                    continue
+
+                if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+
+                name = os.path.relpath(entry.path, self.static_dir).replace(os.sep, "/")
+                found.add(name)
+
+                stat = entry.stat()
+                cached = self.entries.get(name)
+                if cached is not None and cached["mtime"] == stat.st_mtime_ns:
+                    continue
+
+                try:
+                    size = read_image_size(entry.path)
+                except OSError:
+                    size = None
+
+                self.entries[name] = {
+                    "mtime": stat.st_mtime_ns,
+                    "size": list(size) if size is not None else None,
+                }
+                read += 1
+
+        for name in list(self.entries):
+            if name not in found:
+                del self.entries[name]
+
+        return read
+
+    def size(self, url: str) -> list[int]:
+        # Only root-relative URLs point into the static folder
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+
+        entry = self.entries.get(url[1:].split("?", 1)[0].split("#", 1)[0])
+        return entry["size"] if entry is not None else None
+
+    def __repr__(self) -> str:
+        return f"{len(self.entries)} images"
@@ -1,110 +1,313 @@
+import argparse
 import os
-import shutil
 import sys
 
-from markdownblock import markdown_to_html_node, extract_title
+# Only the parser is loaded up front, so --help answers at once. The build
+# itself lives in builder.py and is imported once the arguments are read.
 
 
 def main():
 
-    base_path = "./"
-
-    # Get base path
-    if len(sys.argv) > 1:
-        base_path = sys.argv[1]
-
-    # Create paths
-    static_path = "static/"
-    content_path = "content/"
-    template_path = "template.html"
-
-    public_path = "docs/"
-
-    # Check paths exist
-    if not os.path.exists(static_path):
-        raise Exception(f'The static folder doesn\'t exist. "{static_path}"')
-    if not os.path.exists(content_path):
-        raise Exception(f'The content folder doesn\'t exist. "{content_path}"')
-    if not os.path.exists(template_path):
-        raise Exception(f'The HTML template is missing. "{template_path}"')
-
-    # Clear the public folder
-    if os.path.exists(public_path):
-        shutil.rmtree(public_path)
-
-    os.mkdir(public_path)
-
-    # Populate public folder
-    copy_dir_to_dir(static_path, public_path)
-    generate_pages_recursive(base_path, content_path, template_path, public_path)
-
-
-def copy_dir_to_dir(source: str, destination: str):
-
-    for item in os.listdir(source):
-        src_joined_path = os.path.join(source, item)
-        tgt_joined_path = os.path.join(destination, item)
-
-        if os.path.isfile(src_joined_path):
-            shutil.copy(src_joined_path, tgt_joined_path)
-        else:
-            os.mkdir(tgt_joined_path)
-            copy_dir_to_dir(src_joined_path, tgt_joined_path)
-
-
-def generate_pages_recursive(
-    base_path: str, dir_path_content: str, template_path: str, dest_dir_path: str
-):
-
-    for item in os.listdir(dir_path_content):
-
-        path = os.path.join(dir_path_content, item)
-        dest_path = os.path.join(dest_dir_path, item)
-
-        if os.path.isdir(path):
-            generate_pages_recursive(base_path, path, template_path, dest_path)
-        elif os.path.isfile(path) and ".md" in path:
-            generate_page(base_path, path, template_path, dest_path[:-3] + ".html")
-
-
-def generate_page(base_path: str, src_path: str, template_path: str, dest_path: str):
-
-    print(f"Generating page from {src_path} to {dest_path} using {template_path}")
-
-    if src_path is None or template_path is None or dest_path is None:
-        raise Exception("Error: All paths must have a value")
-
-    with open(src_path) as f:
-        file_contents = f.read()
-        f.close()
-
-    html_node = markdown_to_html_node(file_contents)
-    title = extract_title(html_node)
-
-    with open(template_path) as f:
-        template_contents = f.read()
-        f.close()
-
-    template_contents = template_contents.replace("{{ Title }}", title)
-    template_contents = template_contents.replace("{{ Content }}", html_node.to_html())
-    template_contents = template_contents.replace('href="/', f'href="{base_path}')
-    template_contents = template_contents.replace('src="/', f'src="{base_path}')
-
-    dest_path_split = dest_path.split("/")
-    if not os.path.isfile(dest_path_split[0]):
-
-        if dest_path_split[0] == ".":
-            dest_path_split = dest_path_split[1:]
-
-        path = ""
-        for i in range(len(dest_path_split) - 1):
-            path = os.path.join(path, dest_path_split[i])
-            if not os.path.exists(path):
-                os.mkdir(path)
-
-    with open(dest_path, "w+") as f:
-        f.write(template_contents)
-        f.close()
-
-
-main()
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "preview":
+        preview(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        daemon(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "client":
+        client(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Generate the site from markdown")
+    parser.add_argument("base_path", nargs="?", default="./")
+    add_root_argument(parser)
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="wipe the output folder and regenerate every page",
+    )
+    add_build_arguments(parser)
+    parser.add_argument(
+        "--trace",
+        metavar="OUT.json",
+        help="record where the build spends its time as a Chrome trace",
+    )
+    args = parser.parse_args()
+
+    import tracing
+    from builder import build_site
+
+    if args.trace is not None:
+        tracing.enable()
+
+    with tracing.span("build"):
+        report = build_site(build_config(args, args.base_path, clean=args.clean))
+
+    if args.trace is not None:
+        tracing.save(args.trace)
+
+    print(f"Build: {report}")
+    if not report.ok:
+        report_errors(report.errors)
+        sys.exit(1)
+
+
+def serve(argv: list[str]):
+
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description="Build the site and serve it locally"
+    )
+    add_root_argument(parser)
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild changed files and reload open pages",
+    )
+    add_jobs_argument(parser)
+    add_cache_size_argument(parser)
+    add_stream_threshold_argument(parser)
+    add_ignore_argument(parser)
+    args = parser.parse_args(argv)
+
+    from builder import Builder
+    from server import SiteWatcher, serve_site
+
+    # The site is served from the root, so links need no base path
+    builder = Builder(build_config(args, "/"))
+    config = builder.config
+    report_errors(builder.build().errors)
+
+    watcher = None
+    if args.watch:
+        watcher = SiteWatcher(
+            [
+                config.content_dir,
+                config.static_dir,
+                config.template_path,
+                config.layouts_dir,
+            ]
+        )
+
+    serve_site(
+        config.output_dir,
+        args.port,
+        watcher,
+        lambda changed, removed: report_errors(
+            builder.apply_changes(changed, removed).errors
+        ),
+    )
+
+
+def preview(argv: list[str]):
+
+    parser = argparse.ArgumentParser(
+        prog="main.py preview",
+        description="Serve the site, rendering each page when it is requested",
+    )
+    add_root_argument(parser)
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--page-cache",
+        type=int,
+        metavar="MB",
+        help="size limit of the rendered pages kept in memory",
+    )
+    add_ignore_argument(parser)
+    args = parser.parse_args(argv)
+
+    from builder import BuildConfig, check_paths
+    from preview import PAGE_CACHE_SIZE, PageCache, serve_preview
+
+    config = BuildConfig.for_site(args.root)
+    check_paths(config)
+
+    page_cache_size = PAGE_CACHE_SIZE
+    if args.page_cache is not None:
+        page_cache_size = args.page_cache * 1024 * 1024
+
+    # Nothing is built up front, pages render on their first request and
+    # again only when they or their template change
+    serve_preview(
+        config.static_dir,
+        config.content_dir,
+        config.template_path,
+        args.port,
+        PageCache(page_cache_size),
+        config.ignore_patterns + tuple(args.ignore),
+    )
+
+
+def daemon(argv: list[str]):
+
+    from daemon import DAEMON_SOCKET_PATH, serve_daemon
+
+    parser = argparse.ArgumentParser(
+        prog="main.py daemon",
+        description="Keep the site and its caches loaded, building on request",
+    )
+    parser.add_argument("base_path", nargs="?", default="./")
+    add_root_argument(parser)
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH)
+    add_build_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from builder import Builder
+
+    # Everything a build loads up front stays loaded between builds, along
+    # with the templates parsed in this process
+    builder = Builder(build_config(args, args.base_path))
+
+    serve_daemon(args.socket, builder.build, builder.apply_paths)
+
+
+def client(argv: list[str]):
+
+    from daemon import DAEMON_SOCKET_PATH, send_request
+
+    parser = argparse.ArgumentParser(
+        prog="main.py client", description="Ask a running build daemon for a build"
+    )
+    parser.add_argument("command", choices=["build", "rebuild", "status", "stop"])
+    parser.add_argument(
+        "paths", nargs="*", help="files or folders that changed, for rebuild"
+    )
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH)
+    args = parser.parse_args(argv)
+
+    request = {"command": args.command}
+    if args.command == "rebuild":
+        if len(args.paths) == 0:
+            parser.error("rebuild needs the paths that changed")
+        # The daemon may have been started from another folder
+        request["paths"] = [os.path.abspath(path) for path in args.paths]
+
+    response = send_request(args.socket, request)
+
+    print(response.get("log", ""), end="")
+    report_errors(response.get("errors", []))
+    if "message" in response:
+        print(response["message"])
+
+    if not response["ok"]:
+        sys.exit(1)
+
+
+def build_config(args: argparse.Namespace, base_path: str, **options):
+    from builder import BuildConfig
+
+    # Options left off the command line keep the defaults in BuildConfig
+    for name in ["jobs", "link_assets", "precompress"]:
+        if name in args:
+            options[name] = getattr(args, name)
+    for name in ["compress_min_size", "gzip_level", "brotli_quality"]:
+        if getattr(args, name, None) is not None:
+            options[name] = getattr(args, name)
+    if args.cache_size is not None:
+        options["cache_size"] = args.cache_size * 1024 * 1024
+    if args.stream_threshold is not None:
+        options["stream_threshold"] = args.stream_threshold * 1024 * 1024
+    if getattr(args, "async_io", False):
+        from asyncbuild import IO_CONCURRENCY
+
+        options["io_concurrency"] = args.io_concurrency or IO_CONCURRENCY
+
+    return BuildConfig.for_site(
+        args.root,
+        base_path=base_path,
+        ignore_patterns=BuildConfig.ignore_patterns + tuple(args.ignore),
+        **options,
+    )
+
+
+def add_root_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--root",
+        default="",
+        help="site folder holding content/, static/ and template.html",
+    )
+
+
+def add_build_arguments(parser: argparse.ArgumentParser):
+    add_jobs_argument(parser)
+    add_cache_size_argument(parser)
+    add_stream_threshold_argument(parser)
+    add_ignore_argument(parser)
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="hard link static files into the output instead of copying them",
+    )
+    parser.add_argument(
+        "--async-io",
+        action="store_true",
+        help="overlap file reads and writes with rendering, for slow filesystems",
+    )
+    parser.add_argument(
+        "--io-concurrency",
+        type=int,
+        help="pages in flight at once with --async-io",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz (and .br with the brotli module) next to HTML, CSS and JS",
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        metavar="BYTES",
+        help="leave outputs smaller than this uncompressed",
+    )
+    parser.add_argument("--gzip-level", type=int)
+    parser.add_argument("--brotli-quality", type=int)
+
+
+def add_jobs_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes rendering pages, 0 uses every core",
+    )
+
+
+def add_cache_size_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        metavar="MB",
+        help="size limit of the rendered block cache, 0 turns it off",
+    )
+
+
+def add_stream_threshold_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        metavar="MB",
+        help="stream pages this big or bigger straight to disk, block by block",
+    )
+
+
+def add_ignore_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="skip content matching this glob, by name or path under content/",
+    )
+
+
+def report_errors(errors: list[tuple[str, str]]):
+    for src_path, error in errors:
+        print(f"Error: Failed to generate {src_path}: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+
+from cachefile import save_text
+from imagemeta import ImageSizes
+
+MANIFEST_VERSION = 2
+
+# Precompressed copies written next to an output
+COMPRESSED_SUFFIXES = [".gz", ".br"]
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class Manifest:
+    def __init__(
+        self,
+        path: str,
+        output_dir: str,
+        pages: dict = None,
+        assets: dict = None,
+        compressed: dict = None,
+    ) -> None:
+        self.path = path
+        # Outputs are removed from under output_dir, never the folder itself
+        self.output_dir = output_dir
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else {}
+        self.compressed = compressed if compressed is not None else {}
+        self.seen = set()
+        self._hashes = {}
+
+    @classmethod
+    def load(cls, path: str, output_dir: str) -> "Manifest":
+        if not os.path.isfile(path):
+            return cls(path, output_dir)
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A corrupt manifest only costs a full rebuild
+            return cls(path, output_dir)
+
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path, output_dir)
+
+        return cls(
+            path,
+            output_dir,
+            data.get("pages", {}),
+            data.get("assets", {}),
+            data.get("compressed", {}),
+        )
+
+    def save(self):
+        save_text(
+            self.path,
+            json.dumps(
+                {
+                    "version": MANIFEST_VERSION,
+                    "pages": self.pages,
+                    "assets": self.assets,
+                    "compressed": self.compressed,
+                },
+                indent=1,
+            ),
+        )
+
+    def start_build(self):
+        # Long-lived processes reuse the manifest, so forget last build's state
+        self.seen = set()
+        self._hashes = {}
+
+    def file_hash(self, path: str) -> str:
+        # Skip re-hashing files whose size and mtime match the last build
+        if path in self._hashes:
+            return self._hashes[path]
+
+        stat = os.stat(path)
+        entry = self.pages.get(path)
+
+        if (
+            entry is not None
+            and entry["mtime"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            file_hash = entry["hash"]
+        else:
+            file_hash = hash_file(path)
+
+        self._hashes[path] = file_hash
+        return file_hash
+
+    def is_stale(
+        self,
+        base_path: str,
+        src_path: str,
+        template_path: str,
+        dest_path: str,
+        image_sizes: ImageSizes = None,
+        listing: str = None,
+    ) -> bool:
+        self.seen.add(src_path)
+        entry = self.pages.get(src_path)
+
+        if entry is None or not os.path.isfile(dest_path):
+            return True
+
+        return (
+            entry["hash"] != self.file_hash(src_path)
+            or not os.path.isfile(entry["template"])
+            or entry["template_hash"] != self._template_hash(entry["template"])
+            or entry["base_path"] != base_path
+            or entry["dest"] != dest_path
+            or self._images_changed(entry, image_sizes)
+            or entry.get("listing") != listing
+        )
+
+    def record(
+        self,
+        base_path: str,
+        src_path: str,
+        template_path: str,
+        dest_path: str,
+        image_sizes: ImageSizes = None,
+        listing: str = None,
+        image_urls: list[str] = (),
+    ):
+        self.seen.add(src_path)
+        stat = os.stat(src_path)
+        file_hash = self.file_hash(src_path)
+
+        old_entry = self.pages.get(src_path)
+        if old_entry is not None and old_entry["dest"] != dest_path:
+            remove_output(old_entry["dest"], self.output_dir)
+
+        # Remember the size of every image the page showed as it rendered, a
+        # page is stale once one of them changes
+        images = None
+        if image_sizes is not None:
+            images = {url: image_sizes.size(url) for url in image_urls}
+
+        self.pages[src_path] = {
+            "hash": file_hash,
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "template": template_path,
+            "template_hash": self._template_hash(template_path),
+            "base_path": base_path,
+            "dest": dest_path,
+            "images": images,
+            # Listing pages also go stale when the pages they list change
+            "listing": listing,
+        }
+
+    def remove(self, src_path: str):
+        entry = self.pages.pop(src_path)
+        remove_output(entry["dest"], self.output_dir)
+
+    def prune(self) -> list[str]:
+        # Drop pages whose sources vanished since the last build, with their outputs
+        removed = []
+
+        for src_path in list(self.pages):
+            if src_path in self.seen:
+                continue
+
+            entry = self.pages.pop(src_path)
+            if remove_output(entry["dest"], self.output_dir):
+                removed.append(entry["dest"])
+
+        return removed
+
+    def _images_changed(self, entry: dict, image_sizes: ImageSizes) -> bool:
+        images = entry.get("images")
+        if image_sizes is None or images is None:
+            return (image_sizes is None) != (images is None)
+
+        return any(image_sizes.size(url) != size for url, size in images.items())
+
+    def _template_hash(self, template_path: str) -> str:
+        if template_path not in self._hashes:
+            self._hashes[template_path] = hash_file(template_path)
+        return self._hashes[template_path]
+
+
+def remove_output(dest_path: str, output_dir: str) -> bool:
+    if not os.path.isfile(dest_path):
+        return False
+
+    os.remove(dest_path)
+    remove_siblings(dest_path)
+
+    # Clean up directories the page left empty, stopping at output_dir,
+    # which is kept even when nothing is left in it
+    inside = os.path.join(os.path.abspath(output_dir), "")
+    directory = os.path.dirname(os.path.abspath(dest_path))
+    while directory.startswith(inside) and len(os.listdir(directory)) == 0:
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+    return True
+
+
+def remove_siblings(dest_path: str):
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(dest_path + suffix):
+            os.remove(dest_path + suffix)
@@ -1,6 +1,21 @@
 import re
 from enum import Enum
-from htmlnode import ParentNode, LeafNode
+from itertools import islice
+from typing import Iterable, Iterator
+from blockcache import BlockCache
+from collections import Counter
+from htmlnode import (
+    FragmentNode,
+    HTMLNode,
+    ImageLeafNode,
+    ParentNode,
+    inline_text,
+    node_refs,
+    node_text,
+)
+from imagemeta import ImageSizes
+from search import count_terms
+from template import base_path_rewriter
 from textnode import TextNode, TextType, text_to_textnodes, text_node_to_html_node
 
 
@@ -33,54 +48,315 @@ HTML_BLOCK_TAGS = {
 }
 
 
-def markdown_to_blocks(markdown: str) -> list[str]:
+HEADING_LEVELS = {
+    BlockType.HEADING1: 1,
+    BlockType.HEADING2: 2,
+    BlockType.HEADING3: 3,
+    BlockType.HEADING4: 4,
+    BlockType.HEADING5: 5,
+    BlockType.HEADING6: 6,
+}
+
+# Headings rendered even when cached when only the title is read
+TITLE_LEVELS = frozenset([BlockType.HEADING1])
+
+HEADING_TYPES = {level: block_type for block_type, level in HEADING_LEVELS.items()}
+
+# Blocks rendered together when streaming through the block cache
+STREAM_BATCH = 64
+
+CLOSING_FENCE = re.compile(r"```[^\S\n]*$", re.MULTILINE)
+
+# First characters that can start anything other than a paragraph
+BLOCK_MARKERS = frozenset("#`>-1")
+
+# Characters of text a page result holds before counting its terms
+TERMS_BATCH = 64 * 1024
+
+# Characters dropped from a heading's text when it becomes a slug
+SLUG_JUNK = re.compile(r"[^\w\- ]")
+
+
+class Block:
+    __slots__ = ("block_type", "lines", "line_number")
+
+    def __init__(self, block_type: BlockType, lines: list[str], line_number: int):
+        self.block_type = block_type
+        self.lines = lines
+        self.line_number = line_number
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def __repr__(self) -> str:
+        return f"Block({self.block_type}, {self.lines}, {self.line_number})"
+
+
+class PageResult:
+    # A rendered page with what was learned about it on the way, each block
+    # adds to it as it is rendered so nothing walks the page again
+    __slots__ = (
+        "details",
+        "node",
+        "title",
+        "outline",
+        "words",
+        "links",
+        "images",
+        "_terms",
+        "_texts",
+        "_pending",
+        "_slugs",
+    )
+
+    def __init__(self, details: bool = False) -> None:
+        # The title, search terms and images are always gathered, the
+        # outline, word count and links only when details are asked for
+        self.details = details
+        self.node = None
+        self.title = None
+        self.outline = []
+        self.words = 0
+        self.links = []
+        self.images = []
+        self._terms = Counter()
+        self._texts = []
+        self._pending = 0
+        self._slugs = {}
+
+    @property
+    def terms(self) -> Counter:
+        self.flush_terms()
+        return self._terms
+
+    def flush_terms(self):
+        # Terms are counted a batch of blocks at a time, far cheaper than one
+        # block at a time, and never more than TERMS_BATCH of text is held
+        count_terms(" ".join(self._texts), self._terms)
+        self._texts = []
+        self._pending = 0
+
+    def add_node(self, block: Block, node: HTMLNode):
+        if self.details or has_images(block):
+            self.add_block(block, node, *node_refs(node))
+        else:
+            self.add_block(block, node, node_text(node), [], [])
+
+    def add_block(
+        self,
+        block: Block,
+        node: HTMLNode,
+        text: str,
+        links: list[str],
+        images: list[str],
+    ):
+        # The h1 is never taken from the cache, so its node is at hand
+        if block.block_type == BlockType.HEADING1 and self.title is None:
+            self.title = inline_text(node)
+
+        self._texts.append(text)
+        self._pending += len(text)
+        if self._pending >= TERMS_BATCH:
+            self.flush_terms()
+
+        # The build records the size of every image a page shows
+        self.images.extend(images)
+
+        if not self.details:
+            return
+
+        if block.block_type in HEADING_LEVELS:
+            heading = inline_text(node)
+            self.outline.append(
+                (HEADING_LEVELS[block.block_type], heading, self.slug(heading))
+            )
+
+        self.words += len(text.split())
+        self.links.extend(links)
 
-    blocks = markdown.split("\n\n")
+    def slug(self, heading: str) -> str:
+        # Repeated headings get -1, -2, ... like most renderers do
+        # Each slug remembers the last number it took, so a page repeating
+        # one heading many times doesn't count up from 1 every time
+        slug = slugify(heading)
+        unique = slug
 
-    for i in range(len(blocks) - 1, -1, -1):
-        blocks[i] = blocks[i].strip()
-        if len(blocks[i]) == 0:
-            blocks.pop(i)
+        n = self._slugs.get(slug, 0)
+        while unique in self._slugs:
+            n += 1
+            unique = f"{slug}-{n}"
+
+        self._slugs[slug] = n
+        self._slugs.setdefault(unique, 0)
+        return unique
+
+    def __repr__(self) -> str:
+        return (
+            f"PageResult({self.title}, {self.outline}, {self.words}, "
+            f"{self.links}, {self.images})"
+        )
+
+
+def slugify(text: str) -> str:
+    return SLUG_JUNK.sub("", text.lower()).strip().replace(" ", "-")
+
+
+def scan_blocks(markdown: str) -> Iterator[Block]:
+
+    # Walk the document once, splitting each block into lines a single time
+    # and keeping where it starts. Fenced code runs to its closing fence,
+    # even across blank lines.
+    chunks = markdown.split("\n\n")
+
+    i = 0
+    offset = 0
+    line_number = 0
+    counted = 0
+
+    while i < len(chunks):
+        chunk = chunks[i]
+        chunk_offset = offset
+        i += 1
+        offset += len(chunk) + 2
+
+        block = chunk.strip()
+        if len(block) == 0:
+            continue
+
+        start = chunk_offset
+        if chunk[0] != block[0]:
+            start += len(chunk) - len(chunk.lstrip())
+
+        # Count lines up to each block rather than through every chunk
+        line_number += markdown.count("\n", counted, start)
+        counted = start
+
+        lines = block.split("\n")
+        if block[0] not in BLOCK_MARKERS:
+            # Plain paragraphs are by far the most common block
+            yield Block(BlockType.PARAGRAPH, lines, line_number)
+            continue
+
+        closing_fence = None
+        first_line = lines[0].rstrip()
+        if first_line.startswith("```") and (
+            len(first_line) <= 6 or not first_line.endswith("```")
+        ):
+            # Without a closing fence the backticks are ordinary text
+            closing_fence = CLOSING_FENCE.search(markdown, start + len(lines[0]) + 1)
+
+        if closing_fence is None:
+            yield Block(lines_to_block_type(lines), lines, line_number)
+            continue
+
+        end = closing_fence.end()
+        yield Block(BlockType.CODE, markdown[start:end].split("\n"), line_number)
+
+        # Pick up again right after the closing fence
+        i -= 1
+        offset = chunk_offset
+        while offset + len(chunks[i]) < end:
+            offset += len(chunks[i]) + 2
+            i += 1
+
+        chunks[i] = chunks[i][end - offset :]
+        offset = end
+
+
+def scan_lines(lines: Iterable[str]) -> Iterator[Block]:
+
+    # The same blocks as scan_blocks, read a line at a time so only the
+    # block being built is held in memory
+    chunk = []
+    chunk_start = 0
+    fence = None
+
+    for line_number, line in enumerate(lines):
+        line = line.rstrip("\n")
+
+        if fence is not None:
+            fence.append(line)
+            if CLOSING_FENCE.search(line) is not None:
+                yield Block(BlockType.CODE, fence, chunk_start)
+                fence = None
+            continue
+
+        if line == "":
+            if len(chunk) > 0:
+                yield lines_to_block(chunk, chunk_start)
+                chunk = []
+            continue
+
+        if len(chunk) > 0:
+            chunk.append(line)
+            continue
+
+        # Whitespace before a block is stripped, like scan_blocks does
+        first_line = line.lstrip()
+        if first_line == "":
+            continue
 
-    return blocks
+        chunk_start = line_number
+        opening = first_line.rstrip()
+        if opening.startswith("```") and (
+            len(opening) <= 6 or not opening.endswith("```")
+        ):
+            fence = [first_line]
+        else:
+            chunk = [first_line]
+
+    if len(chunk) > 0:
+        yield lines_to_block(chunk, chunk_start)
+
+    if fence is not None:
+        # A fence never closed is ordinary text, which means reading the rest
+        # of the page again as blocks
+        for block in scan_blocks("\n".join(fence)):
+            block.line_number += chunk_start
+            yield block
+
+
+def lines_to_block(lines: list[str], line_number: int) -> Block:
+    lines = "\n".join(lines).rstrip().split("\n")
+    if lines[0][0] not in BLOCK_MARKERS:
+        return Block(BlockType.PARAGRAPH, lines, line_number)
+
+    return Block(lines_to_block_type(lines), lines, line_number)
+
+
+def markdown_to_blocks(markdown: str) -> list[str]:
+    return [block.text for block in scan_blocks(markdown)]
 
 
 def block_to_block_type(block: str) -> BlockType:
+    return lines_to_block_type(block.strip().split("\n"))
+
+
+def lines_to_block_type(lines: list[str]) -> BlockType:
 
-    block = block.strip()
+    first_line = lines[0]
 
-    if len(block) < 3:
+    if len(lines) == 1 and len(first_line) < 3:
         return BlockType.PARAGRAPH
 
-    match block[0]:
+    match first_line[0]:
 
         case "#":
-            tag = block[:7]
+            tag = first_line[:7]
             for i in range(len(tag)):
                 if tag[i] == "#":
                     continue
                 if tag[i] == " ":
-                    match i:
-                        case 1:
-                            return BlockType.HEADING1
-                        case 2:
-                            return BlockType.HEADING2
-                        case 3:
-                            return BlockType.HEADING3
-                        case 4:
-                            return BlockType.HEADING4
-                        case 5:
-                            return BlockType.HEADING5
-                        case 6:
-                            return BlockType.HEADING6
+                    return HEADING_TYPES[i]
                 break
 
         case "`":
-            if len(block) > 6 and block[:3] == "```" and block[-3:] == "```":
+            length = sum(len(line) for line in lines) + len(lines) - 1
+            if length > 6 and first_line[:3] == "```" and lines[-1][-3:] == "```":
                 return BlockType.CODE
 
         case ">":
-            lines = block.split("\n")
             for line in lines:
                 line = line.strip()
                 if len(line) == 0 or line[0] != ">":
@@ -88,32 +364,43 @@ def block_to_block_type(block: str) -> BlockType:
             return BlockType.QUOTE
 
         case "-":
-            lines = block.split("\n")
             for line in lines:
-                line = line.strip()
-                if len(line) == 0 or line[:2] != "- ":
+                if line.strip()[:2] != "- ":
                     return BlockType.PARAGRAPH
             return BlockType.UNORDERED_LIST
 
         case "1":
-            lines = block.split("\n")
             for i in range(len(lines)):
-                lines[i] = lines[i].strip()
-                if len(lines[i]) == 0 or lines[i][:3] != f"{i + 1}. ":
+                if lines[i].strip()[:3] != f"{i + 1}. ":
                     return BlockType.PARAGRAPH
             return BlockType.ORDERED_LIST
 
     return BlockType.PARAGRAPH
 
 
-def block_to_html_node(block: str, block_type: BlockType) -> ParentNode:
+def text_to_children(text: str) -> list[HTMLNode]:
+    return [text_node_to_html_node(node) for node in text_to_textnodes(text)]
+
+
+def block_to_html_node(
+    block: str, block_type: BlockType, cache: BlockCache = None, base_path: str = "/"
+) -> HTMLNode:
+    if cache is not None:
+        return render_cached_blocks(
+            [Block(block_type, block.split("\n"), 0)], cache, base_path
+        )[0]
+
+    return lines_to_html_node(block.split("\n"), block_type)
+
+
+def lines_to_html_node(lines: list[str], block_type: BlockType) -> ParentNode:
 
     match block_type:
 
         case BlockType.CODE:
-            trimmed_block = block[3:-3]
+            trimmed_block = "\n".join(lines)[3:-3]
 
-            if trimmed_block[0] == "\n":
+            if trimmed_block.startswith("\n"):
                 trimmed_block = trimmed_block[1:]
 
             return ParentNode(
@@ -121,95 +408,212 @@ def block_to_html_node(block: str, block_type: BlockType) -> ParentNode:
                 [text_node_to_html_node(TextNode(trimmed_block, TextType.CODE))],
             )
 
-        case BlockType.HEADING1:
-            text_nodes = text_to_textnodes(block[1:].strip())
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.HEADING1], children_nodes)
-
-        case BlockType.HEADING2:
-            text_nodes = text_to_textnodes(block[2:].strip())
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.HEADING2], children_nodes)
-
-        case BlockType.HEADING3:
-            text_nodes = text_to_textnodes(block[3:].strip())
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.HEADING3], children_nodes)
-
-        case BlockType.HEADING4:
-            text_nodes = text_to_textnodes(block[4:].strip())
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.HEADING4], children_nodes)
-
-        case BlockType.HEADING5:
-            text_nodes = text_to_textnodes(block[5:].strip())
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.HEADING5], children_nodes)
-
-        case BlockType.HEADING6:
-            text_nodes = text_to_textnodes(block[6:].strip())
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.HEADING6], children_nodes)
-
         case BlockType.QUOTE:
-            trimmed_block = re.sub("\n> ", "\n", block[2:].strip())
-            text_nodes = text_to_textnodes(trimmed_block)
-            leaf_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.QUOTE], leaf_nodes)
+            trimmed_block = "\n".join(lines)[2:].strip().replace("\n> ", "\n")
+            return ParentNode(
+                HTML_BLOCK_TAGS[BlockType.QUOTE], text_to_children(trimmed_block)
+            )
 
         case BlockType.ORDERED_LIST:
-            lines = block.split("\n")
-            text_nodes = [text_to_textnodes(line[3:].strip()) for line in lines]
-            children_nodes = []
-
-            for nodes in text_nodes:
-                leafs = ParentNode(
-                    "li", [text_node_to_html_node(node) for node in nodes]
-                )
-                children_nodes.append(leafs)
-
+            children_nodes = [
+                ParentNode("li", text_to_children(line[3:].strip())) for line in lines
+            ]
             return ParentNode(HTML_BLOCK_TAGS[BlockType.ORDERED_LIST], children_nodes)
 
         case BlockType.UNORDERED_LIST:
-            lines = block.split("\n")
-            text_nodes = [text_to_textnodes(line[2:].strip()) for line in lines]
-            children_nodes = []
-
-            for nodes in text_nodes:
-                leafs = ParentNode(
-                    "li", [text_node_to_html_node(node) for node in nodes]
-                )
-                children_nodes.append(leafs)
-
+            children_nodes = [
+                ParentNode("li", text_to_children(line[2:].strip())) for line in lines
+            ]
             return ParentNode(HTML_BLOCK_TAGS[BlockType.UNORDERED_LIST], children_nodes)
 
         case BlockType.PARAGRAPH:
-            text_nodes = text_to_textnodes(block.strip().replace("\n", " "))
-            children_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            return ParentNode(HTML_BLOCK_TAGS[BlockType.PARAGRAPH], children_nodes)
-
-
-def markdown_to_html_node(markdown: str) -> ParentNode:
-
-    blocks = markdown_to_blocks(markdown)
-
-    parent_html_node = ParentNode("div", [])
+            return ParentNode(
+                HTML_BLOCK_TAGS[BlockType.PARAGRAPH],
+                text_to_children(" ".join(lines).strip()),
+            )
 
+    # Headings
+    text = "\n".join(lines)[HEADING_LEVELS[block_type] :].strip()
+    return ParentNode(HTML_BLOCK_TAGS[block_type], text_to_children(text))
+
+
+def render_block(
+    block: Block, image_sizes: ImageSizes = None, page: PageResult = None
+) -> ParentNode:
+    node = lines_to_html_node(block.lines, block.block_type)
+
+    if image_sizes is not None and has_images(block):
+        add_image_attributes(node, image_sizes)
+
+    if page is not None:
+        page.add_node(block, node)
+
+    return node
+
+
+def has_images(block: Block) -> bool:
+    return any("![" in line for line in block.lines)
+
+
+def add_image_attributes(node: HTMLNode, image_sizes: ImageSizes):
+    # A known size reserves the image's box before it loads, so the page
+    # doesn't shift, and lazy images wait until they are scrolled near
+    for child in node.children:
+        if isinstance(child, ImageLeafNode):
+            props = dict(child.props)
+            size = image_sizes.size(props["src"])
+            if size is not None:
+                props["width"], props["height"] = size
+            props["loading"] = "lazy"
+            props["decoding"] = "async"
+            child.props = props
+        else:
+            add_image_attributes(child, image_sizes)
+
+
+def markdown_to_html_node(
+    markdown: str,
+    cache: BlockCache = None,
+    base_path: str = "/",
+    image_sizes: ImageSizes = None,
+) -> ParentNode:
+    return ParentNode(
+        "div", render_blocks(scan_blocks(markdown), cache, base_path, image_sizes)
+    )
+
+
+def markdown_to_page(
+    markdown: str,
+    cache: BlockCache = None,
+    base_path: str = "/",
+    image_sizes: ImageSizes = None,
+    details: bool = False,
+) -> PageResult:
+    page = PageResult(details)
+    page.node = ParentNode(
+        "div",
+        render_blocks(scan_blocks(markdown), cache, base_path, image_sizes, page),
+    )
+    return page
+
+
+def render_blocks(
+    blocks: Iterable[Block],
+    cache: BlockCache = None,
+    base_path: str = "/",
+    image_sizes: ImageSizes = None,
+    page: PageResult = None,
+) -> list[HTMLNode]:
+
+    # Cached blocks come back already rendered for base_path, the rest of
+    # the tree takes it when serialized
+    if cache is not None:
+        return render_cached_blocks(list(blocks), cache, base_path, image_sizes, page)
+
+    return [render_block(block, image_sizes, page) for block in blocks]
+
+
+def render_cached_blocks(
+    blocks: list[Block],
+    cache: BlockCache,
+    base_path: str = "/",
+    image_sizes: ImageSizes = None,
+    page: PageResult = None,
+) -> list[HTMLNode]:
+
+    rewrite_url = base_path_rewriter(base_path)
+
+    # Headings are always rendered when the title or outline is read from
+    # their children. So are blocks with images once they are sized, a
+    # fragment would keep the size the image had when it was cached.
+    fresh = HEADING_LEVELS if page is not None and page.details else TITLE_LEVELS
+    keys = [
+        (
+            cache.key(block.block_type.value, block.text, base_path)
+            if block.block_type not in fresh
+            and (image_sizes is None or not has_images(block))
+            else None
+        )
+        for block in blocks
+    ]
+    rendered = cache.lookup([key for key in keys if key is not None])
+
+    new_fragments = {}
+    nodes = []
+    for block, key in zip(blocks, keys):
+        if key is None:
+            nodes.append(render_block(block, image_sizes, page))
+            continue
+
+        fragment = rendered.get(key)
+        if fragment is None:
+            node = lines_to_html_node(block.lines, block.block_type)
+            fragment = (node.to_html(rewrite_url), *node_refs(node))
+            new_fragments[key] = fragment
+            rendered[key] = fragment
+
+        # Cached fragments go out as they are, with the links and images
+        # they were rendered from
+        html, text, links, images = fragment
+        node = FragmentNode(html, text)
+        if page is not None:
+            page.add_block(block, node, text, links, images)
+        nodes.append(node)
+
+    cache.store(new_fragments)
+
+    return nodes
+
+
+def markdown_to_html_chunks(
+    lines: Iterable[str],
+    cache: BlockCache = None,
+    base_path: str = "/",
+    image_sizes: ImageSizes = None,
+    page: PageResult = None,
+) -> Iterator[str]:
+
+    # Each block is written out as soon as it is complete, the page as a
+    # whole is never held in memory
+    rewrite_url = base_path_rewriter(base_path)
+    yield "<div>"
+
+    # What the page holds is gathered as blocks go by, the text isn't kept
+    blocks = scan_lines(lines)
+    if cache is None:
+        nodes = (render_block(block, image_sizes, page) for block in blocks)
+    else:
+        nodes = (
+            node
+            for batch in iter(lambda: list(islice(blocks, STREAM_BATCH)), [])
+            for node in render_cached_blocks(batch, cache, base_path, image_sizes, page)
+        )
+
+    for node in nodes:
+        yield from node.to_html_chunks(rewrite_url)
+
+    yield "</div>"
+
+
+def find_title(blocks: Iterable[Block]) -> str:
+    title = scan_title(blocks)
+    if title is None:
+        raise Exception("Error: Markdown file should have a main heading (Heading 1)")
+
+    return title
+
+
+def scan_title(blocks: Iterable[Block]) -> str:
+    # Stops at the first h1, without rendering anything before it
     for block in blocks:
+        if block.block_type == BlockType.HEADING1:
+            return inline_text(lines_to_html_node(block.lines, block.block_type))
 
-        block_type = block_to_block_type(block)
-
-        parent_html_node.children.append(block_to_html_node(block, block_type))
-
-    return parent_html_node
+    return None
 
 
 def extract_title(parent_node: ParentNode) -> str:
     for block in parent_node.children:
         if block.tag == "h1":
-            text = ""
-            for child in block.children:
-                text += child.value
-
-            return text
+            return inline_text(block)
     raise Exception("Error: Markdown file should have a main heading (Heading 1)")
@@ -0,0 +1,241 @@
+import os
+from typing import Callable, Iterator
+
+import tracing
+from blockcache import BlockCache
+from frontmatter import read_front_matter, split_front_matter
+from imagemeta import ImageSizes
+from markdownblock import (
+    PageResult,
+    find_title,
+    markdown_to_html_chunks,
+    markdown_to_page,
+    scan_lines,
+)
+from pagemeta import listing_to_html_node
+from template import Template, base_path_rewriter, layout_path, load_template
+
+# Pages at least this big are streamed block by block instead of loaded whole
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+# The image sizes a pool worker was started with, sent to it once instead of
+# with every page
+_worker_image_sizes = None
+
+
+def start_worker(image_sizes: ImageSizes, trace: bool):
+    global _worker_image_sizes
+    _worker_image_sizes = image_sizes
+
+    if trace:
+        tracing.start_worker()
+
+
+def pool_jobs(jobs_args: list[tuple], index: int) -> tuple[ImageSizes, list[tuple]]:
+    # Takes the image sizes at index out of each job, for start_worker to
+    # hand to the workers instead
+    if len(jobs_args) == 0 or len(jobs_args[0]) <= index:
+        return None, jobs_args
+
+    image_sizes = jobs_args[0][index]
+    return image_sizes, [
+        job_args[:index] + (None,) + job_args[index + 1 :] for job_args in jobs_args
+    ]
+
+
+def with_worker_image_sizes(job_args: tuple, index: int) -> tuple:
+    if _worker_image_sizes is None or len(job_args) <= index:
+        return job_args
+
+    return job_args[:index] + (_worker_image_sizes,) + job_args[index + 1 :]
+
+
+def generate_page_job(job_args: tuple) -> tuple[str, str, list[dict], tuple, dict]:
+    # Report failures per page instead of aborting the whole build
+    job_args = with_worker_image_sizes(job_args, 6)
+    block_cache = job_args[4] if len(job_args) > 4 else None
+
+    try:
+        with tracing.span("generate_page", src_path=job_args[1]):
+            page_template_path, page_doc = generate_page(*job_args)
+        error = None
+    except Exception as e:
+        page_template_path = None
+        page_doc = None
+        error = f"{type(e).__name__}: {e}"
+
+    stats = block_cache.take_stats() if block_cache is not None else None
+    return page_template_path, error, tracing.take_events(), stats, page_doc
+
+
+def generate_page(
+    base_path: str,
+    src_path: str,
+    template_path: str,
+    dest_path: str,
+    block_cache: BlockCache = None,
+    stream_threshold: int = STREAM_THRESHOLD,
+    image_sizes: ImageSizes = None,
+    listing: list[dict] = None,
+) -> tuple[str, dict]:
+
+    if src_path is None or template_path is None or dest_path is None:
+        raise Exception("Error: All paths must have a value")
+
+    if os.path.getsize(src_path) >= stream_threshold:
+        return stream_page(
+            base_path,
+            src_path,
+            template_path,
+            dest_path,
+            block_cache,
+            image_sizes,
+            listing,
+        )
+
+    with tracing.span("read"):
+        with open(src_path) as f:
+            file_contents = f.read()
+            f.close()
+
+    page_template_path, template, values, page_doc = prepare_page(
+        base_path, file_contents, template_path, block_cache, image_sizes, listing
+    )
+
+    # Workers may race to create the same folder
+    dest_dir = os.path.dirname(dest_path)
+    if dest_dir != "":
+        os.makedirs(dest_dir, exist_ok=True)
+
+    # Stream the page into the file instead of building it as one string, so
+    # template fill, serialization and the write share one span
+    with tracing.span("fill template and write"):
+        with open(dest_path, "w+") as f:
+            template.write(f, values)
+            f.close()
+
+    return page_template_path, page_doc
+
+
+def render_page_job(
+    job_args: tuple,
+) -> tuple[str, str, str, list[dict], tuple, dict]:
+    # The CPU half of generate_page, for pipelines that do their own I/O
+    job_args = with_worker_image_sizes(job_args, 4)
+    base_path, markdown, template_path, block_cache, image_sizes = job_args[:5]
+    listing = job_args[5] if len(job_args) > 5 else None
+
+    html = None
+    page_doc = None
+    try:
+        with tracing.span("render_page"):
+            page_template_path, template, values, page_doc = prepare_page(
+                base_path, markdown, template_path, block_cache, image_sizes, listing
+            )
+            html = template.render(values)
+        error = None
+    except Exception as e:
+        page_template_path = None
+        error = f"{type(e).__name__}: {e}"
+
+    stats = block_cache.take_stats() if block_cache is not None else None
+    return page_template_path, html, error, tracing.take_events(), stats, page_doc
+
+
+def prepare_page(
+    base_path: str,
+    markdown: str,
+    template_path: str,
+    block_cache: BlockCache = None,
+    image_sizes: ImageSizes = None,
+    listing: list[dict] = None,
+) -> tuple[str, Template, dict, dict]:
+
+    front_matter, markdown = split_front_matter(markdown)
+
+    # The title, the words for the search index and the images the manifest
+    # records are gathered while the page renders
+    with tracing.span("markdown_to_page"):
+        page = markdown_to_page(markdown, block_cache, base_path, image_sizes)
+
+    if page.title is None:
+        raise Exception("Error: Markdown file should have a main heading (Heading 1)")
+
+    page_doc = {"title": page.title, "terms": page.terms, "images": page.images}
+
+    # Pages can pick another shell than the default template
+    with tracing.span("load_template"):
+        page_template_path = layout_path(template_path, front_matter.get("layout"))
+        template = load_template(page_template_path, base_path)
+
+    rewrite_url = base_path_rewriter(base_path)
+    values = {
+        "Title": page.title,
+        "Content": lambda: with_listing(
+            page.node.to_html_chunks(rewrite_url), listing, rewrite_url
+        ),
+    }
+
+    return page_template_path, template, values, page_doc
+
+
+def stream_page(
+    base_path: str,
+    src_path: str,
+    template_path: str,
+    dest_path: str,
+    block_cache: BlockCache = None,
+    image_sizes: ImageSizes = None,
+    listing: list[dict] = None,
+) -> tuple[str, dict]:
+
+    # The title goes in the head, ahead of the content, so find it first
+    with tracing.span("find_title"):
+        with open(src_path) as f:
+            front_matter, lines = read_front_matter(f)
+            title = find_title(scan_lines(lines))
+            f.close()
+
+    with tracing.span("load_template"):
+        page_template_path = layout_path(template_path, front_matter.get("layout"))
+        template = load_template(page_template_path, base_path)
+
+    dest_dir = os.path.dirname(dest_path)
+    if dest_dir != "":
+        os.makedirs(dest_dir, exist_ok=True)
+
+    # Read, convert and write the page a block at a time
+    page = PageResult()
+    rewrite_url = base_path_rewriter(base_path)
+    with tracing.span("stream page"):
+        with open(src_path) as f, open(dest_path, "w+") as out:
+            _, lines = read_front_matter(f)
+            template.write(
+                out,
+                {
+                    "Title": title,
+                    "Content": lambda: with_listing(
+                        markdown_to_html_chunks(
+                            lines, block_cache, base_path, image_sizes, page
+                        ),
+                        listing,
+                        rewrite_url,
+                    ),
+                },
+            )
+
+    return page_template_path, {
+        "title": title,
+        "terms": page.terms,
+        "images": page.images,
+    }
+
+
+def with_listing(
+    chunks: Iterator[str], listing: list[dict], rewrite_url: Callable[[str], str]
+) -> Iterator[str]:
+    # A listing page's list of pages follows its own content
+    yield from chunks
+
+    if listing is not None:
+        yield from listing_to_html_node(listing).to_html_chunks(rewrite_url)
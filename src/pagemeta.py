@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+
+from cachefile import save_text
+from frontmatter import read_front_matter
+from htmlnode import LeafNode, ParentNode
+from markdownblock import scan_lines, scan_title
+
+PAGE_INDEX_VERSION = 1
+
+# Front matter values that turn a flag like draft on
+TRUE_VALUES = frozenset(["true", "yes", "on", "1"])
+
+
+def read_page_meta(src_path: str) -> tuple[dict, str]:
+    # Only the front matter is read, and the body up to its first h1 for the
+    # title, never the rest of the page
+    with open(src_path) as f:
+        front_matter, lines = read_front_matter(f)
+        title = scan_title(scan_lines(lines))
+
+    return front_matter, title
+
+
+def is_draft(front_matter: dict) -> bool:
+    draft = front_matter.get("draft", "")
+    return isinstance(draft, str) and draft.lower() in TRUE_VALUES
+
+
+def page_tags(front_matter: dict) -> list[str]:
+    tags = front_matter.get("tags", [])
+    return [tags] if isinstance(tags, str) else tags
+
+
+def listing_dir(front_matter: dict) -> str:
+    # Like draft, a value written as a list is ignored, the page is not a
+    # listing page
+    list_dir = front_matter.get("list")
+    return list_dir if isinstance(list_dir, str) else None
+
+
+def is_listing(front_matter: dict) -> bool:
+    return listing_dir(front_matter) is not None
+
+
+def page_date(front_matter: dict) -> str:
+    date = front_matter.get("date", "")
+    return date if isinstance(date, str) else ""
+
+
+class PageIndex:
+    def __init__(self, path: str, pages: dict = None) -> None:
+        self.path = path
+        # Maps each page's source to the front matter and title read from
+        # it, its URL, and the mtime and size it was read at
+        self.pages = pages if pages is not None else {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path: str) -> "PageIndex":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A missing or corrupt index only costs reading the headers again
+            return cls(path)
+
+        if data.get("version") != PAGE_INDEX_VERSION:
+            return cls(path)
+
+        return cls(path, data.get("pages", {}))
+
+    def save(self):
+        save_text(
+            self.path,
+            json.dumps({"version": PAGE_INDEX_VERSION, "pages": self.pages}, indent=1),
+        )
+
+    def start_build(self):
+        self.seen = set()
+
+    def refresh(self, src_path: str, url: str) -> dict:
+        # Headers are only read again once a page changes on disk
+        self.seen.add(src_path)
+        stat = os.stat(src_path)
+
+        entry = self.pages.get(src_path)
+        if (
+            entry is None
+            or entry["mtime"] != stat.st_mtime_ns
+            or entry["size"] != stat.st_size
+        ):
+            front_matter, title = read_page_meta(src_path)
+            entry = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "meta": front_matter,
+                "title": title,
+                "url": url,
+            }
+            self.pages[src_path] = entry
+
+        entry["url"] = url
+        return entry
+
+    def remove(self, src_path: str):
+        self.pages.pop(src_path, None)
+
+    def prune(self):
+        # Forget pages whose sources vanished since the last build
+        for src_path in list(self.pages):
+            if src_path not in self.seen:
+                del self.pages[src_path]
+
+    def listing(self, list_dir: str, tag: str = None) -> list[dict]:
+        # Pages under list_dir, newest first, without drafts or other
+        # listing pages. Pages without a date go last.
+        prefix = os.path.join(list_dir, "")
+
+        entries = sorted(
+            (
+                (src_path, entry)
+                for src_path, entry in self.pages.items()
+                if src_path.startswith(prefix)
+                and not is_listing(entry["meta"])
+                and not is_draft(entry["meta"])
+                and (tag is None or tag in page_tags(entry["meta"]))
+            ),
+            key=lambda page: page[0],
+        )
+        entries.sort(key=lambda page: page_date(page[1]["meta"]), reverse=True)
+
+        return [
+            {
+                "url": entry["url"],
+                "title": entry["title"] or entry["url"],
+                "date": page_date(entry["meta"]),
+            }
+            for _, entry in entries
+        ]
+
+    def listing_of(self, src_path: str, content_dir: str) -> list[dict]:
+        # "list: blog" lists the pages under content/blog, "tag: x" keeps
+        # those tagged x
+        meta = self.pages[src_path]["meta"]
+        list_dir = os.path.join(content_dir, listing_dir(meta).strip("/"))
+        tag = meta.get("tag")
+        return self.listing(list_dir, tag if isinstance(tag, str) else None)
+
+    def __repr__(self) -> str:
+        return f"{len(self.pages)} pages"
+
+
+def listing_digest(listing: list[dict]) -> str:
+    return hashlib.sha256(json.dumps(listing).encode()).hexdigest()
+
+
+def listing_to_html_node(listing: list[dict]) -> ParentNode:
+    items = []
+    for page in listing:
+        children = [LeafNode("a", page["title"], {"href": page["url"]})]
+        if page["date"] != "":
+            children.append(LeafNode(None, " "))
+            children.append(LeafNode("time", page["date"], {"datetime": page["date"]}))
+        items.append(ParentNode("li", children))
+
+    return ParentNode("ul", items, {"class": "listing"})
@@ -0,0 +1,223 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import unquote, urlsplit
+
+from discovery import IGNORE_PATTERNS, PAGE_SUFFIX, is_ignored
+from page import render_page_job
+
+PAGE_CACHE_SIZE = 64 * 1024 * 1024
+
+
+def file_stamps(paths: list[str]) -> tuple:
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamps.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+
+class PageCache:
+    def __init__(self, max_size: int = PAGE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Rendered pages by source path, least recently used first, with the
+        # files they were rendered from and their stamps at the time
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None:
+                paths, stamps, body = entry
+                # Stale once the page or its template changed on disk
+                if file_stamps(paths) == stamps:
+                    self._pages.move_to_end(key)
+                    self.hits += 1
+                    return body
+
+                del self._pages[key]
+                self.size -= len(body)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, paths: list[str], stamps: tuple, body: bytes):
+        if stamps is None or len(body) > self.max_size:
+            return
+
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self.size -= len(old[2])
+
+            self._pages[key] = (paths, stamps, body)
+            self.size += len(body)
+
+            while self.size > self.max_size:
+                _, (_, _, evicted) = self._pages.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __repr__(self) -> str:
+        return (
+            f"{len(self._pages)} pages, {self.size // 1024}KB, "
+            f"{self.hits} hits, {self.misses} misses"
+        )
+
+
+def page_source(
+    url_path: str, content_dir: str, ignore_patterns: tuple[str, ...] = IGNORE_PATTERNS
+) -> str:
+    # The reverse of discover_pages: /blog/ and /blog/index.html come from
+    # blog/index.md, /about.html from about.md
+    relative_path = unquote(url_path).lstrip("/")
+    if relative_path == "" or relative_path.endswith("/"):
+        relative_path += "index.html"
+    if not relative_path.endswith(".html"):
+        return None
+
+    src_path = os.path.normpath(
+        os.path.join(content_dir, relative_path[: -len(".html")] + PAGE_SUFFIX)
+    )
+
+    # Never outside the content folder
+    if os.path.relpath(src_path, content_dir).startswith(".."):
+        return None
+    if not os.path.isfile(src_path) or is_ignored(
+        src_path, content_dir, ignore_patterns
+    ):
+        return None
+
+    return src_path
+
+
+def render_preview(
+    src_path: str, template_path: str, page_cache: PageCache, base_path: str = "/"
+) -> bytes:
+    body = page_cache.get(src_path)
+    if body is not None:
+        return body
+
+    # Stamped before reading, so an edit made mid-render is picked up next time
+    stamps = file_stamps([src_path])
+    with open(src_path) as f:
+        markdown = f.read()
+
+    page_template_path, html, error, _, _, _ = render_page_job(
+        (base_path, markdown, template_path, None, None)
+    )
+    if error is not None:
+        raise Exception(error)
+
+    template_stamps = file_stamps([page_template_path])
+    if stamps is not None and template_stamps is not None:
+        stamps += template_stamps
+
+    body = html.encode()
+    page_cache.put(src_path, [src_path, page_template_path], stamps, body)
+    return body
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    def __init__(
+        self,
+        *args,
+        find_page: Callable[[str], str] = None,
+        render_page: Callable[[str], bytes] = None,
+        **kwargs,
+    ):
+        self.find_page = find_page
+        self.render_page = render_page
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        self.send_page(head_only=False)
+
+    def do_HEAD(self):
+        self.send_page(head_only=True)
+
+    def send_page(self, head_only: bool):
+        url_path = urlsplit(self.path).path
+
+        # A folder with an index page needs the trailing slash for its
+        # relative links, like the static handler redirects
+        if not url_path.endswith("/") and self.find_page(url_path + "/") is not None:
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", url_path + "/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        src_path = self.find_page(url_path)
+        if src_path is None:
+            # Everything else is a static file
+            return super().do_HEAD() if head_only else super().do_GET()
+
+        try:
+            body = self.render_page(src_path)
+        except Exception as e:
+            self.send_error(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                f"Failed to generate {src_path}",
+                str(e),
+            )
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def copyfile(self, source, outputfile):
+        # Static files go from the page cache of the kernel to the socket
+        # without a trip through Python
+        self.wfile.flush()
+        self.connection.sendfile(source)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_preview(
+    static_dir: str,
+    content_dir: str,
+    template_path: str,
+    port: int,
+    page_cache: PageCache,
+    ignore_patterns: tuple[str, ...] = IGNORE_PATTERNS,
+):
+
+    handler = partial(
+        PreviewHandler,
+        directory=static_dir,
+        find_page=lambda url_path: page_source(url_path, content_dir, ignore_patterns),
+        render_page=lambda src_path: render_preview(
+            src_path, template_path, page_cache
+        ),
+    )
+
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+
+    print(f"Previewing {content_dir} at http://localhost:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Page cache: {page_cache}")
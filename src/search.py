@@ -0,0 +1,229 @@
+import json
+import os
+import re
+from collections import Counter
+
+from cachefile import save_text
+
+SEARCH_INDEX_VERSION = 1
+
+# Terms are sharded by their first characters, the browser only fetches the
+# shards for the words typed
+PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 32
+
+# Whole words only, longer ones are skipped rather than cut
+TERM = re.compile(rf"\b\w{{{MIN_TERM_LENGTH},{MAX_TERM_LENGTH}}}\b")
+
+
+def count_terms(text: str, counts: Counter = None) -> Counter:
+    if counts is None:
+        counts = Counter()
+
+    counts.update(TERM.findall(text.lower()))
+    return counts
+
+
+def shard_name(term: str) -> str:
+    return term[:PREFIX_LENGTH]
+
+
+class SearchReport:
+    def __init__(self) -> None:
+        self.updated = 0
+        self.removed = 0
+        self.shards = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.updated} pages updated, {self.removed} removed, "
+            f"{self.shards} shards written"
+        )
+
+
+class SearchIndex:
+    def __init__(
+        self, path: str, output_dir: str, docs: dict = None, next_id: int = 0
+    ) -> None:
+        self.path = path
+        self.output_dir = output_dir
+        # Every indexed page by source path, with its id, URL, title and the
+        # terms it holds, so its postings can be taken out again later
+        self.docs = docs if docs is not None else {}
+        self.next_id = next_id
+        # Doc ids touched since the last write, with the terms they held before
+        self._changed = {}
+
+    @classmethod
+    def load(cls, path: str, output_dir: str) -> "SearchIndex":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path, output_dir)
+
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            return cls(path, output_dir)
+
+        return cls(path, output_dir, data["docs"], data["next_id"])
+
+    def save(self):
+        save_text(
+            self.path,
+            json.dumps(
+                {
+                    "version": SEARCH_INDEX_VERSION,
+                    "docs": self.docs,
+                    "next_id": self.next_id,
+                },
+                separators=(",", ":"),
+            ),
+        )
+
+    def update(self, src_path: str, url: str, title: str, terms: dict[str, int]):
+        doc = self.docs.get(src_path)
+
+        if doc is None:
+            doc = {"id": self.next_id, "terms": {}}
+            self.next_id += 1
+            self.docs[src_path] = doc
+
+        self._changed.setdefault(doc["id"], doc["terms"])
+        doc["url"] = url
+        doc["title"] = title
+        doc["terms"] = terms
+
+    def remove(self, src_path: str):
+        doc = self.docs.pop(src_path, None)
+        if doc is not None:
+            self._changed.setdefault(doc["id"], doc["terms"])
+
+    def retain(self, src_paths: set[str]):
+        # Drop pages that are no longer part of the site
+        for src_path in list(self.docs):
+            if src_path not in src_paths:
+                self.remove(src_path)
+
+    def write(self) -> SearchReport:
+        report = SearchReport()
+        docs_path = os.path.join(self.output_dir, "docs.json")
+
+        # Without the shards of the last build there is nothing to patch, so
+        # everything is written from the terms kept per page
+        if not os.path.isfile(docs_path):
+            remove_shards(self.output_dir, self.shard_names())
+            self._changed = {doc["id"]: {} for doc in self.docs.values()}
+        elif len(self._changed) == 0:
+            return report
+
+        docs_by_id = {doc["id"]: doc for doc in self.docs.values()}
+
+        # Only terms whose count changed on a page are touched, so only the
+        # shards holding them are rewritten
+        shards = {}
+        for doc_id, old_terms in self._changed.items():
+            doc = docs_by_id.get(doc_id)
+            new_terms = doc["terms"] if doc is not None else {}
+
+            if doc is None:
+                report.removed += 1
+            else:
+                report.updated += 1
+
+            for term in old_terms.keys() | new_terms.keys():
+                count = new_terms.get(term)
+                if count != old_terms.get(term):
+                    shards.setdefault(shard_name(term), []).append(
+                        (term, doc_id, count)
+                    )
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        for name, changes in shards.items():
+            self._write_shard(name, changes)
+        report.shards = len(shards)
+
+        write_json(
+            docs_path,
+            {
+                "version": SEARCH_INDEX_VERSION,
+                "prefix_length": PREFIX_LENGTH,
+                "docs": {
+                    doc["id"]: [doc["url"], doc["title"]] for doc in self.docs.values()
+                },
+            },
+        )
+
+        self._changed = {}
+        return report
+
+    def shard_names(self) -> set[str]:
+        # Every shard the kept terms were written to, before and after the
+        # changes since the last write
+        terms = set()
+        for doc in self.docs.values():
+            terms.update(doc["terms"])
+        for old_terms in self._changed.values():
+            terms.update(old_terms)
+
+        return {shard_name(term) for term in terms}
+
+    def _write_shard(self, name: str, changes: list[tuple[str, int, int]]):
+        shard_path = os.path.join(self.output_dir, f"{name}.json")
+
+        try:
+            with open(shard_path) as f:
+                shard = json.load(f)
+        except (OSError, ValueError):
+            shard = {}
+
+        # Replace the page's posting for each changed term, a count of None
+        # means the page no longer has the term
+        touched = {}
+        for term, doc_id, count in changes:
+            postings = touched.get(term)
+            if postings is None:
+                postings = touched[term] = dict(shard.get(term, []))
+
+            if count is None:
+                postings.pop(doc_id, None)
+            else:
+                postings[doc_id] = count
+
+        for term, postings in touched.items():
+            if len(postings) == 0:
+                shard.pop(term, None)
+                continue
+
+            # Most frequent first, the browser can stop after the best matches
+            shard[term] = sorted(
+                ([doc_id, count] for doc_id, count in postings.items()),
+                key=lambda posting: (-posting[1], posting[0]),
+            )
+
+        if len(shard) == 0:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+            return
+
+        write_json(shard_path, shard)
+
+    def __repr__(self) -> str:
+        return f"{len(self.docs)} pages"
+
+
+def write_json(path: str, data: dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        # Sorted so an unchanged index is written byte for byte the same
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+def remove_shards(output_dir: str, names: set[str]):
+    # Only shards the index wrote, static files copied next to them stay
+    for name in names:
+        shard_path = os.path.join(output_dir, f"{name}.json")
+        if os.path.isfile(shard_path):
+            os.remove(shard_path)
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+).encode()
+
+
+class ReloadBroadcaster:
+    def __init__(self) -> None:
+        self.version = 0
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class SiteWatcher:
+    def __init__(self, paths: list[str]) -> None:
+        self.paths = paths
+        self.files = self.snapshot()
+
+    def snapshot(self) -> dict[str, tuple[int, int]]:
+        files = {}
+
+        for path in self.paths:
+            if os.path.isfile(path):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+                continue
+
+            stack = [path]
+            while len(stack) > 0:
+                try:
+                    entries = list(os.scandir(stack.pop()))
+                except FileNotFoundError:
+                    continue
+
+                for entry in entries:
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                        continue
+
+                    # Editors' swap and temporary files can be gone again by
+                    # the time they are looked at
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+        return files
+
+    def poll(self) -> tuple[list[str], list[str]]:
+        files = self.snapshot()
+
+        changed = sorted(
+            path for path, stat in files.items() if self.files.get(path) != stat
+        )
+        removed = sorted(path for path in self.files if path not in files)
+
+        self.files = files
+        return changed, removed
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, broadcaster: ReloadBroadcaster = None, **kwargs):
+        self.broadcaster = broadcaster
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.broadcaster is None:
+            return super().do_GET()
+
+        url_path = urlsplit(self.path).path
+        if url_path == LIVE_RELOAD_PATH:
+            return self.send_reload_events()
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+
+        if not path.endswith(".html") or not os.path.isfile(path):
+            return super().do_GET()
+
+        with open(path, "rb") as f:
+            html = f.read()
+
+        # Pages connect back to the server to hear about rebuilds
+        body_end = html.rfind(b"</body>")
+        if body_end == -1:
+            html += LIVE_RELOAD_SCRIPT
+        else:
+            html = html[:body_end] + LIVE_RELOAD_SCRIPT + html[body_end:]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(html)
+
+    def send_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        version = self.broadcaster.version
+        try:
+            while True:
+                new_version = self.broadcaster.wait(version, 15)
+                if new_version == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_site(
+    directory: str,
+    port: int,
+    watcher: SiteWatcher = None,
+    on_change=None,
+    interval: float = 0.05,
+):
+
+    broadcaster = ReloadBroadcaster() if watcher is not None else None
+    handler = partial(LiveReloadHandler, directory=directory, broadcaster=broadcaster)
+
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"Serving {directory} at http://localhost:{port}")
+
+    try:
+        while True:
+            if watcher is None:
+                time.sleep(3600)
+                continue
+
+            time.sleep(interval)
+            changed, removed = watcher.poll()
+            if len(changed) == 0 and len(removed) == 0:
+                continue
+
+            start = time.perf_counter()
+            if on_change is not None:
+                try:
+                    on_change(changed, removed)
+                except Exception as e:
+                    # Keep watching, the next save may well fix it
+                    print(f"Rebuild failed: {type(e).__name__}: {e}")
+                    continue
+            broadcaster.notify()
+
+            elapsed = (time.perf_counter() - start) * 1000
+            print(
+                f"Rebuilt {len(changed) + len(removed)} changed files in {elapsed:.0f}ms"
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,103 @@
+import os
+import re
+from typing import Callable, Iterator, TextIO
+
+TEMPLATE_SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# href and src attributes holding a root-relative URL, inside a tag
+HTML_TAG = re.compile(r"<[^<>]*>")
+URL_ATTRIBUTE = re.compile(r'(\s(?:href|src)=")/(?!/)')
+
+
+class Template:
+    def __init__(self, source: str, base_path: str = "/") -> None:
+        # Compiled once into alternating static segments and slots:
+        # segments[0] slots[0] segments[1] ... slots[n - 1] segments[n]
+        self.segments = []
+        self.slots = []
+
+        last_index = 0
+        for slot in TEMPLATE_SLOT.finditer(source):
+            self.segments.append(
+                rewrite_urls(source[last_index : slot.start()], base_path)
+            )
+            self.slots.append((slot.group(1), slot.group()))
+            last_index = slot.end()
+
+        self.segments.append(rewrite_urls(source[last_index:], base_path))
+
+    def render_chunks(self, values: dict) -> Iterator[str]:
+        for segment, (name, raw) in zip(self.segments, self.slots):
+            yield segment
+
+            # Unknown slots are left in the page untouched
+            value = values.get(name, raw)
+            if callable(value):
+                yield from value()
+            else:
+                yield value
+
+        yield self.segments[-1]
+
+    def render(self, values: dict) -> str:
+        return "".join(self.render_chunks(values))
+
+    def write(self, fp: TextIO, values: dict):
+        fp.writelines(self.render_chunks(values))
+
+
+def rewrite_urls(html: str, base_path: str) -> str:
+    # Only run over template source, once when it is compiled. Pages rewrite
+    # their URLs as they render, see base_path_rewriter
+    return HTML_TAG.sub(
+        lambda tag: URL_ATTRIBUTE.sub(
+            lambda match: match.group(1) + base_path, tag.group()
+        ),
+        html,
+    )
+
+
+def base_path_rewriter(base_path: str) -> Callable[[str], str]:
+    if base_path == "/":
+        return None
+
+    def rewrite_url(url: str) -> str:
+        # Root-relative URLs move under the base path, protocol-relative and
+        # absolute ones are left alone
+        if url.startswith("/") and not url.startswith("//"):
+            return base_path + url[1:]
+        return url
+
+    return rewrite_url
+
+
+_templates = {}
+
+
+def load_template(template_path: str, base_path: str = "/") -> Template:
+    # Each template is read and compiled once per process, and again only
+    # when the file changes on disk
+    stat = os.stat(template_path)
+    key = (template_path, base_path)
+
+    cached = _templates.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+
+    with open(template_path) as f:
+        template = Template(f.read(), base_path)
+        f.close()
+
+    _templates[key] = ((stat.st_mtime_ns, stat.st_size), template)
+    return template
+
+
+def layout_path(template_path: str, layout: str) -> str:
+    if layout is None or layout == "":
+        return template_path
+
+    path = os.path.join(os.path.dirname(template_path), "layouts", f"{layout}.html")
+    if not os.path.exists(path):
+        raise Exception(f'The layout "{layout}" is missing. "{path}"')
+
+    return path
@@ -0,0 +1,34 @@
+import os
+import struct
+import tempfile
+import unittest
+
+
+def png(width: int, height: int) -> bytes:
+    # Just the header, all an image's size is read from
+    return (
+        b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+        + struct.pack(">II", width, height)
+        + b"\x08\x02\x00\x00\x00"
+    )
+
+
+class TempSiteTestCase(unittest.TestCase):
+    # Each test gets a site folder of its own, removed again after the test
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, contents: str | bytes) -> str:
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(contents, bytes) else "w") as f:
+            f.write(contents)
+        return path
+
+    def read(self, name: str) -> str:
+        with open(os.path.join(self.root, name)) as f:
+            return f.read()
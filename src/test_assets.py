@@ -0,0 +1,76 @@
+import os
+import unittest
+
+from assets import sync_dir
+from tempsite import TempSiteTestCase
+
+
+class TestSyncDir(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static_path = os.path.join(self.root, "static")
+        self.public_path = os.path.join(self.root, "docs")
+
+        self.write("static/index.css", "body {}")
+        self.write("static/images/logo.png", "png bytes")
+
+    def test_first_sync_copies_everything(self):
+        synced = {}
+        report = sync_dir(self.static_path, self.public_path, synced)
+
+        self.assertEqual(report.copied, 2)
+        self.assertEqual(report.bytes_copied, 16)
+        self.assertEqual(self.read("docs/images/logo.png"), "png bytes")
+        self.assertEqual(
+            synced[os.path.join(self.public_path, "index.css")],
+            os.path.join(self.static_path, "index.css"),
+        )
+
+    def test_unchanged_files_are_skipped(self):
+        synced = {}
+        sync_dir(self.static_path, self.public_path, synced)
+        self.write("static/index.css", "body { margin: 0 }")
+
+        report = sync_dir(self.static_path, self.public_path, synced)
+
+        self.assertEqual((report.copied, report.skipped), (1, 1))
+        self.assertEqual(self.read("docs/index.css"), "body { margin: 0 }")
+
+    def test_stale_outputs_are_removed(self):
+        synced = {}
+        sync_dir(self.static_path, self.public_path, synced)
+        os.remove(os.path.join(self.static_path, "images/logo.png"))
+
+        report = sync_dir(self.static_path, self.public_path, synced)
+
+        self.assertEqual(report.removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public_path, "images")))
+
+    def test_last_stale_output_keeps_output_folder(self):
+        synced = {}
+        sync_dir(self.static_path, self.public_path, synced)
+        for name in ["index.css", "images/logo.png"]:
+            os.remove(os.path.join(self.static_path, name))
+
+        report = sync_dir(self.static_path, self.public_path, synced)
+
+        self.assertEqual(report.removed, 2)
+        self.assertEqual(os.listdir(self.public_path), [])
+
+    def test_outputs_not_synced_are_kept(self):
+        self.write("docs/index.html", "<p>page</p>")
+        sync_dir(self.static_path, self.public_path, {})
+        self.assertEqual(self.read("docs/index.html"), "<p>page</p>")
+
+    def test_hard_links(self):
+        sync_dir(self.static_path, self.public_path, {}, link=True)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.static_path, "index.css"),
+                os.path.join(self.public_path, "index.css"),
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
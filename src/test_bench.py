@@ -0,0 +1,65 @@
+import os
+import random
+import tempfile
+import unittest
+
+from bench import generate_markdown, generate_site, run_adversarial, run_stages, slow_cases
+from markdownblock import extract_title, markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_same_seed_same_markdown(self):
+        self.assertEqual(
+            generate_markdown(random.Random(3)), generate_markdown(random.Random(3))
+        )
+
+    def test_different_seed_different_markdown(self):
+        self.assertNotEqual(
+            generate_markdown(random.Random(3)), generate_markdown(random.Random(4))
+        )
+
+    def test_markdown_renders(self):
+        rng = random.Random(0)
+        for i in range(20):
+            node = markdown_to_html_node(generate_markdown(rng))
+            self.assertNotEqual(extract_title(node), "")
+
+    def test_mix_selects_blocks(self):
+        markdown = generate_markdown(random.Random(0), 10, {"code": 1})
+        self.assertEqual(markdown.count("```"), 20)
+
+
+class TestStages(unittest.TestCase):
+    def test_run_stages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = generate_site(tmp, pages=3, blocks=5)
+            self.assertTrue(all(os.path.isfile(path) for path in paths))
+
+            results = run_stages(paths, "<title>{{ Title }}</title>{{ Content }}", 1)
+
+        self.assertEqual(results["pages"], 3)
+        self.assertListEqual(
+            list(results["stages"]),
+            [
+                "read",
+                "markdown_to_blocks",
+                "block_to_block_type",
+                "text_to_textnodes",
+                "markdown_to_html_node",
+                "markdown_to_page",
+                "to_html",
+                "template_fill",
+                "write",
+            ],
+        )
+
+
+class TestAdversarial(unittest.TestCase):
+    def test_inline_parsing_is_linear(self):
+        results = run_adversarial(size=5000, repeat=3)
+        self.assertListEqual(slow_cases(results), [])
+        self.assertIn("unclosed_links/text_to_textnodes", results)
+
+
+if __name__ == "__main__":
+    unittest.main()
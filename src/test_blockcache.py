@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import unittest
+
+from blockcache import BlockCache
+from markdownblock import extract_title, markdown_to_html_node, markdown_to_page
+from tempsite import TempSiteTestCase
+
+MARKDOWN = """# Title
+
+A paragraph with **bold** and a [link](/about).
+
+- one
+- two
+"""
+
+
+class TestBlockCache(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = BlockCache(os.path.join(self.root, ".cache/blocks.sqlite"))
+
+    def tearDown(self):
+        self.cache.close()
+        super().tearDown()
+
+    def test_lookup_and_store(self):
+        key = BlockCache.key("paragraph", "Some text")
+
+        self.assertEqual(self.cache.lookup([key]), {})
+        self.cache.store({key: ("<p>Some text</p>", "Some text", ["/a"], [])})
+        self.assertEqual(
+            self.cache.lookup([key]), {key: ("<p>Some text</p>", "Some text", ["/a"], [])}
+        )
+        self.assertEqual(self.cache.take_stats(), (1, 1))
+
+    def test_older_cache_is_replaced(self):
+        os.makedirs(os.path.dirname(self.cache.path))
+        connection = sqlite3.connect(self.cache.path)
+        connection.execute("CREATE TABLE blocks (key TEXT PRIMARY KEY, html TEXT)")
+        connection.commit()
+        connection.close()
+
+        key = BlockCache.key("paragraph", "Some text")
+        self.cache.store({key: ("<p>Some text</p>", "Some text", [], [])})
+        self.assertEqual(len(self.cache.lookup([key])), 1)
+
+    def test_key_depends_on_block_type(self):
+        self.assertNotEqual(
+            BlockCache.key("paragraph", "> text"), BlockCache.key("quote", "> text")
+        )
+
+    def test_same_html_as_uncached(self):
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+
+        self.assertEqual(markdown_to_html_node(MARKDOWN, self.cache).to_html(), expected)
+        self.assertEqual(self.cache.take_stats(), (0, 2))
+
+        node = markdown_to_html_node(MARKDOWN, self.cache)
+        self.assertEqual(node.to_html(), expected)
+        self.assertEqual(extract_title(node), "Title")
+        self.assertEqual(self.cache.take_stats(), (2, 0))
+
+    def test_same_page_result_as_uncached(self):
+        expected = markdown_to_page(MARKDOWN, details=True)
+
+        for _ in range(2):
+            page = markdown_to_page(MARKDOWN, self.cache, details=True)
+            self.assertEqual(page.title, expected.title)
+            self.assertEqual(page.outline, expected.outline)
+            self.assertEqual(page.words, expected.words)
+            self.assertEqual(page.links, ["/about"])
+            self.assertEqual(page.terms, expected.terms)
+
+    def test_cached_headings_keep_title_and_terms(self):
+        markdown = MARKDOWN + "\n## Setup\n\nMore text\n"
+        expected = markdown_to_page(markdown)
+
+        for _ in range(2):
+            page = markdown_to_page(markdown, self.cache)
+            self.assertEqual(page.title, expected.title)
+            self.assertEqual(page.terms, expected.terms)
+            self.assertEqual(page.node.to_html(), expected.node.to_html())
+
+    def test_edit_renders_only_changed_block(self):
+        markdown_to_html_node(MARKDOWN, self.cache)
+        self.cache.take_stats()
+
+        markdown_to_html_node(MARKDOWN.replace("- two", "- three"), self.cache)
+        self.assertEqual(self.cache.take_stats(), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        old_key = BlockCache.key("paragraph", "old")
+        new_key = BlockCache.key("paragraph", "new")
+        self.cache.store({old_key: ("x" * 60, "", [], [])})
+        self.cache.store({new_key: ("y" * 60, "", [], [])})
+
+        self.cache.max_size = 100
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(
+            self.cache.lookup([old_key, new_key]), {new_key: ("y" * 60, "", [], [])}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
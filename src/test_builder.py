@@ -0,0 +1,312 @@
+import gzip
+import os
+import unittest
+
+from builder import BuildConfig, Builder, build_site, generate_pages_recursive
+from discovery import discover_pages
+from tempsite import TempSiteTestCase, png
+
+
+class TestGeneratePages(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content_path = os.path.join(self.root, "content")
+        self.public_path = os.path.join(self.root, "docs")
+        self.template_path = self.write(
+            "template.html", "<title>{{ Title }}</title>{{ Content }}"
+        )
+
+        self.write("content/index.md", "# Home\n\n[Blog](/blog)")
+        self.write("content/blog/first/index.md", "# First")
+        self.write("content/blog/second/index.md", "# Second")
+        self.write("content/notes.txt", "Not a page")
+
+    def test_discover_pages_is_sorted(self):
+        pages = list(discover_pages(self.content_path, self.public_path))
+        self.assertListEqual(
+            [
+                (
+                    os.path.join(self.content_path, "blog/first/index.md"),
+                    os.path.join(self.public_path, "blog/first/index.html"),
+                ),
+                (
+                    os.path.join(self.content_path, "blog/second/index.md"),
+                    os.path.join(self.public_path, "blog/second/index.html"),
+                ),
+                (
+                    os.path.join(self.content_path, "index.md"),
+                    os.path.join(self.public_path, "index.html"),
+                ),
+            ],
+            pages,
+        )
+
+    def test_serial_and_parallel_output_match(self):
+        generate_pages_recursive(
+            "/site/", self.content_path, self.template_path, self.public_path, jobs=1
+        )
+        serial = self.read("docs/index.html")
+
+        generate_pages_recursive(
+            "/site/", self.content_path, self.template_path, self.public_path, jobs=2
+        )
+
+        self.assertEqual(serial, self.read("docs/index.html"))
+        self.assertEqual(
+            serial,
+            '<title>Home</title><div><h1>Home</h1><p><a href="/site/blog">Blog</a></p></div>',
+        )
+
+    def test_base_path_leaves_code_alone(self):
+        self.write(
+            "content/index.md",
+            '# Home\n\n[Blog](/blog) ![Logo](/logo.png)\n\n```\n<a href="/">x</a>\n```',
+        )
+
+        generate_pages_recursive(
+            "/site/", self.content_path, self.template_path, self.public_path
+        )
+
+        self.assertEqual(
+            self.read("docs/index.html"),
+            '<title>Home</title><div><h1>Home</h1><p><a href="/site/blog">Blog</a> '
+            '<img src="/site/logo.png" alt="Logo"/></p>'
+            '<pre><code><a href="/">x</a>\n</code></pre></div>',
+        )
+
+    def test_async_io_output_matches(self):
+        generate_pages_recursive(
+            "/site/", self.content_path, self.template_path, self.public_path
+        )
+        serial = self.read("docs/index.html")
+
+        for jobs in [1, 2]:
+            errors = generate_pages_recursive(
+                "/site/",
+                self.content_path,
+                self.template_path,
+                self.public_path,
+                jobs=jobs,
+                io_concurrency=4,
+            )
+
+            self.assertEqual(errors, [])
+            self.assertEqual(serial, self.read("docs/index.html"))
+
+    def test_async_io_errors_are_reported_per_page(self):
+        self.write("content/broken/index.md", "No title here")
+
+        errors = generate_pages_recursive(
+            "/", self.content_path, self.template_path, self.public_path, io_concurrency=4
+        )
+
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0][0].endswith("broken/index.md"))
+
+    def test_errors_are_reported_per_page(self):
+        self.write("content/broken/index.md", "No title here")
+
+        errors = generate_pages_recursive(
+            "/", self.content_path, self.template_path, self.public_path, jobs=2
+        )
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(
+            errors[0][0], os.path.join(self.content_path, "broken/index.md")
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.public_path, "index.html")))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.public_path, "blog/second/index.html"))
+        )
+
+    def test_layout_from_front_matter(self):
+        self.write("layouts/blog.html", "<article>{{ Content }}</article>")
+        self.write("content/blog/first/index.md", "---\nlayout: blog\n---\n# First")
+
+        generate_pages_recursive(
+            "/", self.content_path, self.template_path, self.public_path
+        )
+
+        self.assertEqual(
+            self.read("docs/blog/first/index.html"),
+            "<article><div><h1>First</h1></div></article>",
+        )
+
+    def test_streamed_page_matches(self):
+        self.write("layouts/blog.html", "<article>{{ Title }}{{ Content }}</article>")
+        self.write(
+            "content/blog/first/index.md",
+            "---\nlayout: blog\n---\nIntro\n\n# First\n\n```\na\n\nb\n```\n\n[Home](/)",
+        )
+
+        generate_pages_recursive(
+            "/site/", self.content_path, self.template_path, self.public_path
+        )
+        loaded = self.read("docs/blog/first/index.html")
+
+        generate_pages_recursive(
+            "/site/",
+            self.content_path,
+            self.template_path,
+            self.public_path,
+            stream_threshold=0,
+        )
+
+        self.assertEqual(loaded, self.read("docs/blog/first/index.html"))
+        self.assertTrue(loaded.startswith("<article>First<div><p>Intro</p>"))
+
+    def test_build_site_from_another_folder(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        config = BuildConfig.for_site(self.root, base_path="/site/", cache_size=0)
+
+        report = build_site(config)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.generated, 3)
+        self.assertIn('href="/site/blog"', self.read("docs/index.html"))
+        self.assertTrue(os.path.isfile(os.path.join(self.root, ".cache/manifest.json")))
+
+        report = build_site(config)
+        self.assertEqual((report.generated, report.skipped, report.removed), (0, 3, 0))
+
+    def test_resized_image_rebuilds_page(self):
+        self.write("content/index.md", "# Home\n\n![Logo](/logo.png)")
+        logo_path = os.path.join(self.root, "static/logo.png")
+        config = BuildConfig.for_site(self.root, cache_size=0, jobs=2)
+
+        for io_concurrency in [0, 4]:
+            config.io_concurrency = io_concurrency
+            self.write("static/logo.png", png(4, 3))
+            os.utime(logo_path, ns=(1, 1))
+            build_site(config)
+            self.assertIn('width="4" height="3"', self.read("docs/index.html"))
+
+            self.write("static/logo.png", png(8, 6))
+            os.utime(logo_path, ns=(2, 2))
+            report = build_site(config)
+            self.assertEqual(report.generated, 1)
+            self.assertIn('width="8" height="6"', self.read("docs/index.html"))
+
+    def test_nested_output_folder(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        config = BuildConfig.for_site(self.root, cache_size=0)
+        config.output_dir = os.path.join(self.root, "out/site")
+
+        report = build_site(config)
+        self.assertTrue(report.ok)
+        self.assertIn("<h1>Home</h1>", self.read("out/site/index.html"))
+
+    def test_builder_applies_changes(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        builder = Builder(BuildConfig.for_site(self.root, cache_size=0))
+        builder.build()
+
+        index_path = self.write("content/index.md", "# New home")
+        first_path = os.path.join(self.content_path, "blog/first/index.md")
+        os.remove(first_path)
+
+        report = builder.apply_changes([index_path], [first_path])
+        self.assertEqual((report.generated, report.removed), (1, 1))
+        self.assertIn("New home", self.read("docs/index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public_path, "blog/first")))
+
+    def test_listing_pages(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        config = BuildConfig.for_site(self.root, cache_size=0)
+        self.write("content/blog/index.md", "---\nlist: blog\n---\n# Blog")
+        self.write("content/blog/first/index.md", "---\ndate: 2024-01-01\n---\n# First")
+        self.write("content/blog/second/index.md", "---\ndate: 2024-02-01\n---\n# Second")
+        self.write("content/blog/third/index.md", "---\ndraft: true\n---\n# Third")
+
+        report = build_site(config)
+        self.assertEqual(report.generated, 4)
+        listing = self.read("docs/blog/index.html")
+        self.assertLess(listing.index("Second"), listing.index("First"))
+        self.assertNotIn("Third", listing)
+        self.assertFalse(os.path.exists(os.path.join(self.public_path, "blog/third")))
+
+        # Only the post and the listing showing its date are rendered again
+        self.write("content/blog/first/index.md", "---\ndate: 2024-03-01\n---\n# First")
+        report = build_site(config)
+        self.assertEqual(report.generated, 2)
+        listing = self.read("docs/blog/index.html")
+        self.assertLess(listing.index("First"), listing.index("Second"))
+
+        # A change to the body alone leaves the listing as it is
+        self.write("content/blog/first/index.md", "---\ndate: 2024-03-01\n---\n# First\n\nMore")
+        self.assertEqual(build_site(config).generated, 1)
+
+    def test_list_written_as_a_list_builds_a_plain_page(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        self.write("content/blog/index.md", "---\nlist: [blog, news]\n---\n# Blog")
+
+        report = build_site(BuildConfig.for_site(self.root, cache_size=0))
+        self.assertTrue(report.ok)
+        self.assertNotIn('class="listing"', self.read("docs/blog/index.html"))
+
+    def test_listing_drops_deleted_pages(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        config = BuildConfig.for_site(self.root, cache_size=0)
+        self.write("content/blog/index.md", "---\nlist: blog\n---\n# Blog")
+        build_site(config)
+        self.assertIn("Second", self.read("docs/blog/index.html"))
+
+        os.remove(os.path.join(self.content_path, "blog/second/index.md"))
+        report = build_site(config)
+        self.assertEqual((report.generated, report.removed), (1, 1))
+        self.assertNotIn("Second", self.read("docs/blog/index.html"))
+
+    def test_builder_applies_changes_to_listings(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        self.write("content/blog/index.md", "---\nlist: blog\n---\n# Blog")
+        builder = Builder(BuildConfig.for_site(self.root, cache_size=0))
+        builder.build()
+
+        third_path = self.write("content/blog/third/index.md", "# Third")
+        report = builder.apply_changes([third_path], [])
+        self.assertEqual(report.generated, 2)
+        self.assertIn("Third", self.read("docs/blog/index.html"))
+
+        self.write("content/blog/third/index.md", "---\ndraft: true\n---\n# Third")
+        report = builder.apply_changes([third_path], [])
+        self.assertEqual((report.generated, report.removed), (1, 1))
+        self.assertNotIn("Third", self.read("docs/blog/index.html"))
+
+    def test_listing_after_the_pages_it_lists(self):
+        os.makedirs(os.path.join(self.root, "static"))
+        listing_path = self.write("content/blog/index.md", "---\nlist: blog\n---\n# Blog")
+        builder = Builder(BuildConfig.for_site(self.root, cache_size=0))
+        builder.build()
+
+        # The listing sorts ahead of the new post, it still shows it
+        listing_path = self.write("content/blog/index.md", "---\nlist: blog\n---\n# All posts")
+        zeta_path = self.write("content/blog/zeta/index.md", "# Zeta")
+        report = builder.apply_changes(sorted([zeta_path, listing_path]), [])
+        self.assertEqual(report.generated, 2)
+        self.assertIn("Zeta", self.read("docs/blog/index.html"))
+        self.assertIn("All posts", self.read("docs/blog/index.html"))
+
+    def test_applied_changes_are_compressed(self):
+        self.write("static/style.css", "body {}")
+        builder = Builder(
+            BuildConfig.for_site(
+                self.root, cache_size=0, precompress=True, compress_min_size=0
+            )
+        )
+        builder.build()
+
+        index_path = self.write("content/index.md", "# New home")
+        style_path = self.write("static/style.css", "body { margin: 0 }")
+        builder.apply_changes([index_path, style_path], [])
+
+        with gzip.open(os.path.join(self.public_path, "index.html.gz"), "rt") as f:
+            self.assertIn("New home", f.read())
+        with gzip.open(os.path.join(self.public_path, "style.css.gz"), "rt") as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_missing_content_folder(self):
+        with self.assertRaises(Exception):
+            Builder(BuildConfig.for_site(os.path.join(self.root, "nowhere")))
+
+
+if __name__ == "__main__":
+    unittest.main()
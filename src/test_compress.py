@@ -0,0 +1,79 @@
+import gzip
+import os
+import unittest
+
+from compress import Compressor
+from manifest import remove_output
+from tempsite import TempSiteTestCase
+
+
+class TestCompress(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = "<p>" + "Some page text. " * 200 + "</p>"
+        self.dest_path = self.write("docs/index.html", self.page)
+
+    def compress(self, compressed: dict, *paths: str):
+        compressor = Compressor(compressed, threads=2)
+        for path in paths:
+            compressor.submit(path)
+        return compressor.wait()
+
+    def test_writes_gzip_sibling(self):
+        report = self.compress({}, self.dest_path)
+
+        self.assertEqual(report.compressed, 1)
+        with gzip.open(self.dest_path + ".gz", "rt") as f:
+            self.assertEqual(f.read(), self.page)
+
+    def test_unchanged_output_is_skipped(self):
+        compressed = {}
+        self.compress(compressed, self.dest_path)
+
+        report = self.compress(compressed, self.dest_path)
+        self.assertEqual((report.compressed, report.unchanged), (0, 1))
+
+    def test_rewritten_but_identical_output_is_skipped(self):
+        compressed = {}
+        self.compress(compressed, self.dest_path)
+        self.write("docs/index.html", self.page)
+        os.utime(self.dest_path, ns=(0, 0))
+
+        report = self.compress(compressed, self.dest_path)
+        self.assertEqual((report.compressed, report.unchanged), (0, 1))
+
+    def test_changed_output_is_recompressed(self):
+        compressed = {}
+        self.compress(compressed, self.dest_path)
+        self.write("docs/index.html", self.page + "<p>More</p>")
+
+        report = self.compress(compressed, self.dest_path)
+        self.assertEqual(report.compressed, 1)
+
+    def test_small_and_binary_outputs_are_left_alone(self):
+        small_path = self.write("docs/small.html", "<p>Hi</p>")
+        image_path = self.write("docs/image.png", "x" * 4096)
+
+        report = self.compress({}, small_path, image_path)
+
+        self.assertEqual(report.compressed, 0)
+        self.assertFalse(os.path.exists(small_path + ".gz"))
+        self.assertFalse(os.path.exists(image_path + ".gz"))
+
+    def test_output_removed_before_compressing_is_skipped(self):
+        compressor = Compressor({}, threads=1)
+        compressor.submit(os.path.join(self.root, "docs/gone.html"))
+        compressor.submit(self.dest_path)
+
+        report = compressor.wait()
+        self.assertEqual(report.compressed, 1)
+        self.assertTrue(os.path.exists(self.dest_path + ".gz"))
+
+    def test_removed_output_takes_its_siblings(self):
+        self.compress({}, self.dest_path)
+        remove_output(self.dest_path, os.path.join(self.root, "docs"))
+        self.assertFalse(os.path.exists(self.dest_path + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
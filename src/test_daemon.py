@@ -0,0 +1,149 @@
+import os
+import socket
+import threading
+import unittest
+
+from builder import BuildConfig, Builder, BuildReport
+from daemon import BuildDaemon, send_request
+from tempsite import TempSiteTestCase
+
+
+class TestDaemon(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.root, ".cache/daemon.sock")
+        self.rebuilt = []
+
+        def on_build():
+            print("Generated every page")
+            return BuildReport(generated=2, skipped=1)
+
+        def on_rebuild(paths):
+            self.rebuilt.append(paths)
+            return BuildReport([(path, "broken") for path in paths])
+
+        self.daemon = BuildDaemon(self.socket_path, on_build, on_rebuild)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            send_request(self.socket_path, {"command": "stop"})
+        self.thread.join()
+        self.daemon.server_close()
+        super().tearDown()
+
+    def test_build_returns_its_log(self):
+        response = send_request(self.socket_path, {"command": "build"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["log"], "Generated every page\n")
+        self.assertEqual(response["errors"], [])
+        self.assertEqual(
+            response["report"], {"generated": 2, "skipped": 1, "removed": 0}
+        )
+
+    def test_rebuild_paths_are_passed_on(self):
+        path = os.path.join(os.getcwd(), "content/index.md")
+        response = send_request(
+            self.socket_path, {"command": "rebuild", "paths": [path]}
+        )
+        self.assertFalse(response["ok"])
+        self.assertEqual(self.rebuilt, [[path]])
+        self.assertEqual(response["errors"], [[path, "broken"]])
+
+    def test_builds_are_counted(self):
+        send_request(self.socket_path, {"command": "build"})
+        send_request(self.socket_path, {"command": "build"})
+        response = send_request(self.socket_path, {"command": "status"})
+        self.assertTrue(response["message"].startswith("2 builds"))
+
+    def test_unknown_command(self):
+        response = send_request(self.socket_path, {"command": "explode"})
+        self.assertFalse(response["ok"])
+        self.assertIn("explode", response["message"])
+
+    def test_stop(self):
+        response = send_request(self.socket_path, {"command": "stop"})
+        self.assertTrue(response["ok"])
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+
+    def test_second_daemon_is_refused(self):
+        with self.assertRaises(Exception):
+            BuildDaemon(self.socket_path, None, None)
+
+        # The probe is not answered, and the daemon still serves afterwards
+        response = send_request(self.socket_path, {"command": "status"})
+        self.assertTrue(response["ok"])
+
+    def test_client_gone_before_reply(self):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.socket_path)
+        client.sendall(b'{"command": "status"}\n')
+        client.close()
+
+        response = send_request(self.socket_path, {"command": "build"})
+        self.assertTrue(response["ok"])
+
+    def test_stale_socket_is_replaced(self):
+        stale_path = os.path.join(self.root, "stale.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(stale_path)
+        stale.close()
+
+        with self.assertRaises(Exception):
+            send_request(stale_path, {"command": "status"})
+
+        daemon = BuildDaemon(stale_path, None, None)
+        daemon.server_close()
+
+
+class TestDaemonBuilds(TempSiteTestCase):
+    def setUp(self):
+        # An absolute site folder, away from the working directory
+        super().setUp()
+        self.write("template.html", "{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post/index.md", "# Post")
+        self.write("static/style.css", "body {}")
+
+        self.socket_path = os.path.join(self.root, ".cache/daemon.sock")
+        self.builder = Builder(BuildConfig.for_site(self.root, cache_size=0))
+        self.daemon = BuildDaemon(
+            self.socket_path,
+            self.builder.build,
+            self.builder.apply_paths,
+        )
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        send_request(self.socket_path, {"command": "stop"})
+        self.thread.join()
+        self.daemon.server_close()
+        super().tearDown()
+
+    def test_rebuild_with_absolute_root(self):
+        send_request(self.socket_path, {"command": "build"})
+
+        post_path = self.write("content/blog/post/index.md", "# Edited")
+        style_path = self.write("static/style.css", "body { margin: 0 }")
+        response = send_request(
+            self.socket_path, {"command": "rebuild", "paths": [post_path, style_path]}
+        )
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["report"]["generated"], 1)
+        self.assertIn("<h1>Edited</h1>", self.read("docs/blog/post/index.html"))
+        self.assertEqual(self.read("docs/style.css"), "body { margin: 0 }")
+
+        # The page is kept under one manifest entry, a full build leaves it be
+        response = send_request(self.socket_path, {"command": "build"})
+        self.assertNotIn("Removed", response["log"])
+        self.assertEqual(
+            response["report"], {"generated": 0, "skipped": 2, "removed": 0}
+        )
+        self.assertIn("<h1>Edited</h1>", self.read("docs/blog/post/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import unittest
+
+from discovery import discover_pages, is_ignored
+from tempsite import TempSiteTestCase
+
+
+class TestDiscovery(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content_path = os.path.join(self.root, "content")
+        self.public_path = os.path.join(self.root, "docs")
+
+    def add_page(self, name: str):
+        self.write(os.path.join("content", name), "# Title")
+
+    def discover(self, ignore_patterns: tuple[str, ...] = (".*",)) -> list[str]:
+        return [
+            os.path.relpath(src_path, self.content_path)
+            for src_path, _ in discover_pages(
+                self.content_path, self.public_path, ignore_patterns
+            )
+        ]
+
+    def test_only_markdown_suffix_is_a_page(self):
+        for name in ["index.md", "index.md.bak", "notes.mdx", "md", "a.md/b.txt"]:
+            self.add_page(name)
+
+        self.assertEqual(self.discover(), ["index.md"])
+
+    def test_folders_and_pages_in_name_order(self):
+        for name in ["b.md", "a/z.md", "a/b/c.md", "c.md", "a/a.md"]:
+            self.add_page(name)
+
+        self.assertEqual(
+            self.discover(), ["a/a.md", "a/b/c.md", "a/z.md", "b.md", "c.md"]
+        )
+
+    def test_ignore_patterns(self):
+        for name in [
+            "index.md",
+            ".hidden.md",
+            ".git/page.md",
+            "drafts/post.md",
+            "blog/post.md",
+            "blog/post.draft.md",
+        ]:
+            self.add_page(name)
+
+        self.assertEqual(
+            self.discover((".*", "drafts", "blog/*.draft.md")),
+            ["blog/post.md", "index.md"],
+        )
+        self.assertTrue(
+            is_ignored(
+                os.path.join(self.content_path, "drafts/post.md"),
+                self.content_path,
+                ("drafts",),
+            )
+        )
+        self.assertFalse(
+            is_ignored(
+                os.path.join(self.content_path, "blog/post.md"),
+                self.content_path,
+                ("drafts",),
+            )
+        )
+
+    def test_deep_tree_does_not_recurse(self):
+        self.add_page("/".join(["d"] * 600) + "/page.md")
+        self.assertEqual(len(self.discover()), 1)
+
+    def test_pages_come_one_at_a_time(self):
+        self.add_page("a.md")
+        pages = discover_pages(self.content_path, self.public_path)
+
+        self.assertEqual(
+            next(pages),
+            (
+                os.path.join(self.content_path, "a.md"),
+                os.path.join(self.public_path, "a.html"),
+            ),
+        )
+        self.assertIsNone(next(pages, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
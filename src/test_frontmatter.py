@@ -0,0 +1,47 @@
+import io
+import unittest
+
+from frontmatter import read_front_matter, split_front_matter
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        markdown = "# Title\n\nText"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_front_matter(self):
+        markdown = '---\nlayout: blog\ntitle: "A: B"\n# comment\n---\n# Title'
+        self.assertEqual(
+            split_front_matter(markdown),
+            ({"layout": "blog", "title": "A: B"}, "# Title"),
+        )
+
+    def test_lists(self):
+        markdown = "---\ntags: [python, 'web']\naliases:\n  - /old\n  - /older\nlayout:\n---\n# Title"
+        self.assertEqual(
+            split_front_matter(markdown)[0],
+            {"tags": ["python", "web"], "aliases": ["/old", "/older"], "layout": ""},
+        )
+
+    def test_empty_list(self):
+        self.assertEqual(split_front_matter("---\ntags: []\n---\n")[0], {"tags": []})
+
+    def test_unclosed_front_matter_is_content(self):
+        markdown = "---\nlayout: blog\n# Title"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_read_front_matter_from_lines(self):
+        front_matter, lines = read_front_matter(
+            io.StringIO("---\nlayout: blog\n---\n# Title\n")
+        )
+        self.assertEqual(front_matter, {"layout": "blog"})
+        self.assertEqual(list(lines), ["# Title\n"])
+
+    def test_read_unclosed_front_matter_is_content(self):
+        markdown = "---\nlayout: blog\n# Title"
+        front_matter, lines = read_front_matter(io.StringIO(markdown))
+        self.assertEqual((front_matter, "".join(lines)), ({}, markdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
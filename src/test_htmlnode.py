@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, ImageLeafNode, LeafNode, ParentNode
 
 class TestHTMLNode(unittest.TestCase):
     def test_init(self):
@@ -17,6 +18,35 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual(node2.children, [])
         self.assertEqual(node2.props, {})
     
+    def test_defaults_are_not_shared(self):
+        node = HTMLNode()
+        node2 = HTMLNode()
+        node.children.append(LeafNode("b", "child"))
+        self.assertEqual(node2.children, [])
+
+    def test_nodes_have_no_dict(self):
+        for node in [HTMLNode(), LeafNode("b", "bold"), ParentNode("p", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_rewrites_url_props(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", 'href="/"', {"href": "/about", "title": "/about"}),
+                ImageLeafNode("img", "", {"src": "/a.png", "alt": "/a.png"}),
+            ],
+        )
+        self.assertEqual(
+            node.to_html(lambda url: "/site" + url),
+            '<p><a href="/site/about" title="/about">href="/"</a>'
+            '<img src="/site/a.png" alt="/a.png"/></p>',
+        )
+
+    def test_empty_props(self):
+        node = LeafNode("b", "bold", {})
+        self.assertEqual(node.props, {})
+        self.assertEqual(node.to_html(), "<b>bold</b>")
+
     def test_props(self):
         
         props = {
@@ -48,6 +78,16 @@ class TestHTMLNode(unittest.TestCase):
         
         self.assertEqual(f'HTMLNode({values[0]}, {values[1]}, {values[2]}, {values[3]})', repr)
 
+    def test_props_are_read_only(self):
+        node = HTMLNode("a", "link", None, {"href": "/"})
+        with self.assertRaises(TypeError):
+            node.props["href"] = "/other"
+        with self.assertRaises(TypeError):
+            HTMLNode().props["href"] = "/other"
+
+        node.props = {"href": "/other"}
+        self.assertEqual(node.props, {"href": "/other"})
+
 class TestLeafNode(unittest.TestCase):
     def test_p_leaf_to_html_p(self):
         node = LeafNode("p", "Hello, world!")
@@ -71,6 +111,32 @@ class TestParentNode(unittest.TestCase):
             parent_node.to_html(),
             "<div><span><b>grandchild</b></span></div>",
         )    
+
+    def test_to_html_chunks(self):
+        parent_node = ParentNode("ul", [
+            ParentNode("li", [LeafNode("", "one")]),
+            ParentNode("li", [LeafNode("b", "two")]),
+        ])
+        self.assertListEqual(
+            list(parent_node.to_html_chunks()),
+            ["<ul>", "<li>", "one", "</li>", "<li>", "<b>two</b>", "</li>", "</ul>"],
+        )
+
+    def test_write_html_matches_to_html(self):
+        parent_node = ParentNode("div", [
+            LeafNode("a", "link", {"href": "/"}),
+            ParentNode("p", [LeafNode("i", "text")]),
+        ])
+        fp = io.StringIO()
+        parent_node.write_html(fp)
+        self.assertEqual(fp.getvalue(), parent_node.to_html())
+
+    def test_deeply_nested_to_html(self):
+        node = LeafNode("", "deep")
+        for i in range(5000):
+            node = ParentNode("div", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<div>" * 5000 + "deep</div>"))
     
         
 if __name__ == "__main__":
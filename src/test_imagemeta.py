@@ -0,0 +1,103 @@
+import os
+import struct
+import unittest
+
+from imagemeta import ImageSizes, read_image_size
+from tempsite import TempSiteTestCase, png
+
+
+class TestImageMeta(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static_path = os.path.join(self.root, "static")
+
+    def test_png_size(self):
+        path = self.write("a.png", png(640, 480))
+        self.assertEqual(read_image_size(path), (640, 480))
+
+    def test_gif_size(self):
+        path = self.write("a.gif", b"GIF89a" + struct.pack("<HH", 32, 16) + b"\0" * 8)
+        self.assertEqual(read_image_size(path), (32, 16))
+
+    def test_jpeg_size_after_other_segments(self):
+        path = self.write(
+            "a.jpg",
+            b"\xff\xd8"
+            + b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+            + b"\xff\xdb\x00\x04\x00\x00"
+            + b"\xff\xc2\x00\x11\x08"
+            + struct.pack(">HH", 600, 800)
+            + b"\x03" * 10,
+        )
+        self.assertEqual(read_image_size(path), (800, 600))
+
+    def test_webp_sizes(self):
+        lossy = self.write(
+            "lossy.webp",
+            b"RIFF\0\0\0\0WEBPVP8 \0\0\0\0\0\0\0\x9d\x01\x2a"
+            + struct.pack("<HH", 300, 200),
+        )
+        lossless = self.write(
+            "lossless.webp",
+            b"RIFF\0\0\0\0WEBPVP8L\0\0\0\0\x2f"
+            + struct.pack("<I", (300 - 1) | (200 - 1) << 14)
+            + b"\0" * 8,
+        )
+        extended = self.write(
+            "extended.webp",
+            b"RIFF\0\0\0\0WEBPVP8X\0\0\0\0\0\0\0\0"
+            + (300 - 1).to_bytes(3, "little")
+            + (200 - 1).to_bytes(3, "little")
+            + b"\0" * 2,
+        )
+
+        for path in [lossy, lossless, extended]:
+            self.assertEqual(read_image_size(path), (300, 200))
+
+    def test_unknown_format_has_no_size(self):
+        path = self.write("a.png", b"not an image at all")
+        self.assertIsNone(read_image_size(path))
+
+    def test_truncated_header_has_no_size(self):
+        path = self.write("static/a.png", png(640, 480)[:20])
+        self.write("static/b.gif", b"GIF89a\x20")
+        self.write("static/c.webp", b"RIFF\x00\x00\x00\x00WEBPVP8 ")
+        self.assertIsNone(read_image_size(path))
+
+        image_sizes = ImageSizes.load("images.json", self.static_path)
+        self.assertEqual(image_sizes.refresh(), 3)
+        for url in ["/a.png", "/b.gif", "/c.webp"]:
+            self.assertIsNone(image_sizes.size(url))
+
+    def test_sizes_are_read_once(self):
+        self.write("static/images/a.png", png(10, 20))
+        cache_path = os.path.join(self.root, ".cache/images.json")
+
+        image_sizes = ImageSizes.load(cache_path, self.static_path)
+        self.assertEqual(image_sizes.refresh(), 1)
+        image_sizes.save()
+
+        image_sizes = ImageSizes.load(cache_path, self.static_path)
+        self.assertEqual(image_sizes.refresh(), 0)
+        self.assertEqual(image_sizes.size("/images/a.png"), [10, 20])
+        self.assertEqual(image_sizes.size("/images/a.png?v=2"), [10, 20])
+        self.assertIsNone(image_sizes.size("images/a.png"))
+        self.assertIsNone(image_sizes.size("https://example.com/images/a.png"))
+
+    def test_changed_and_removed_images(self):
+        path = self.write("static/a.png", png(10, 20))
+        self.write("static/b.png", png(1, 1))
+        image_sizes = ImageSizes.load("images.json", self.static_path)
+        image_sizes.refresh()
+
+        self.write("static/a.png", png(30, 40))
+        os.utime(path, ns=(0, 0))
+        os.remove(os.path.join(self.static_path, "b.png"))
+
+        self.assertEqual(image_sizes.refresh(), 1)
+        self.assertEqual(image_sizes.size("/a.png"), [30, 40])
+        self.assertIsNone(image_sizes.size("/b.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
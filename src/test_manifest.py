@@ -0,0 +1,132 @@
+import os
+import unittest
+
+from imagemeta import ImageSizes
+from manifest import Manifest
+from tempsite import TempSiteTestCase
+
+
+class TestManifest(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.src_path = self.write("content/index.md", "# Title")
+        self.template_path = self.write("template.html", "{{ Content }}")
+        self.dest_path = self.write("docs/index.html", "<h1>Title</h1>")
+        self.manifest_path = os.path.join(self.root, ".cache/manifest.json")
+        self.output_path = os.path.join(self.root, "docs")
+
+    def recorded_manifest(self) -> Manifest:
+        manifest = Manifest(self.manifest_path, self.output_path)
+        manifest.record("/", self.src_path, self.template_path, self.dest_path)
+        manifest.save()
+        return Manifest.load(self.manifest_path, self.output_path)
+
+    def test_new_page_is_stale(self):
+        manifest = Manifest(self.manifest_path, self.output_path)
+        self.assertTrue(
+            manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+        )
+
+    def test_unchanged_page_is_fresh(self):
+        manifest = self.recorded_manifest()
+        self.assertFalse(
+            manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+        )
+
+    def test_touched_but_unchanged_page_is_fresh(self):
+        manifest = self.recorded_manifest()
+        os.utime(self.src_path, ns=(0, 0))
+        self.assertFalse(
+            manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+        )
+
+    def test_edited_source_is_stale(self):
+        manifest = self.recorded_manifest()
+        self.write("content/index.md", "# Another Title")
+        self.assertTrue(
+            manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+        )
+
+    def test_edited_template_is_stale(self):
+        manifest = self.recorded_manifest()
+        self.write("template.html", "<main>{{ Content }}</main>")
+        self.assertTrue(
+            manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+        )
+
+    def test_new_base_path_is_stale(self):
+        manifest = self.recorded_manifest()
+        self.assertTrue(
+            manifest.is_stale(
+                "/blog/", self.src_path, self.template_path, self.dest_path
+            )
+        )
+
+    def test_resized_image_is_stale(self):
+        self.write("content/index.md", "# Title\n\n![Photo](/photo.png)")
+        image_sizes = ImageSizes("images.json", "static", {"photo.png": {"size": [4, 3]}})
+        manifest = Manifest(self.manifest_path, self.output_path)
+        manifest.record(
+            "/",
+            self.src_path,
+            self.template_path,
+            self.dest_path,
+            image_sizes,
+            image_urls=["/photo.png"],
+        )
+        self.assertFalse(
+            manifest.is_stale(
+                "/", self.src_path, self.template_path, self.dest_path, image_sizes
+            )
+        )
+
+        image_sizes.entries["photo.png"]["size"] = [8, 6]
+        self.assertTrue(
+            manifest.is_stale(
+                "/", self.src_path, self.template_path, self.dest_path, image_sizes
+            )
+        )
+
+    def test_missing_output_is_stale(self):
+        manifest = self.recorded_manifest()
+        os.remove(self.dest_path)
+        self.assertTrue(
+            manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+        )
+
+    def test_prune_removes_vanished_outputs(self):
+        manifest = self.recorded_manifest()
+
+        removed = manifest.prune()
+
+        self.assertEqual(removed, [self.dest_path])
+        self.assertFalse(os.path.exists(self.dest_path))
+        self.assertEqual(manifest.pages, {})
+
+    def test_removing_last_output_keeps_output_folder(self):
+        output_path = os.path.join(self.root, "www/site")
+        dest_path = self.write("www/site/blog/post/index.html", "<h1>Post</h1>")
+        manifest = Manifest(self.manifest_path, output_path)
+        manifest.record("/", self.src_path, self.template_path, dest_path)
+
+        manifest.remove(self.src_path)
+
+        self.assertFalse(os.path.exists(os.path.join(output_path, "blog")))
+        self.assertEqual(os.listdir(output_path), [])
+        self.assertTrue(os.path.isdir(self.root))
+
+    def test_prune_keeps_seen_pages(self):
+        manifest = self.recorded_manifest()
+        manifest.is_stale("/", self.src_path, self.template_path, self.dest_path)
+
+        self.assertEqual(manifest.prune(), [])
+        self.assertTrue(os.path.exists(self.dest_path))
+
+    def test_corrupt_manifest_loads_empty(self):
+        self.write(".cache/manifest.json", "{not json")
+        self.assertEqual(Manifest.load(self.manifest_path, self.output_path).pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
 import unittest
+from imagemeta import ImageSizes
+from htmlnode import LeafNode, ParentNode
 from markdownblock import *
 
 
@@ -241,6 +243,64 @@ the **same** even with inline stuff
         expected_html = '<div><p>Here is a <a href="https://example.com">link</a> and an <img src="https://img.com/img.png" alt="image"/></p></div>'
         self.assertEqual(markdown_to_html_node(markdown).to_html(), expected_html)
 
+    def test_images_get_sizes_and_lazy_loading(self):
+        image_sizes = ImageSizes("images.json", "static", {"a.png": {"size": [4, 3]}})
+        markdown = "![A](/a.png) ![B](https://example.com/b.png)"
+        expected_html = (
+            '<div><p><img src="/a.png" alt="A" width="4" height="3" loading="lazy" decoding="async"/> '
+            '<img src="https://example.com/b.png" alt="B" loading="lazy" decoding="async"/></p></div>'
+        )
+        self.assertEqual(
+            markdown_to_html_node(markdown, image_sizes=image_sizes).to_html(),
+            expected_html,
+        )
+
+    def test_code_block_keeps_blank_lines(self):
+        markdown = "Before\n\n```\nfirst\n\n\nsecond\n```\n\nAfter"
+        expected_html = "<div><p>Before</p><pre><code>first\n\n\nsecond\n</code></pre><p>After</p></div>"
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), expected_html)
+
+    def test_unclosed_code_fence_is_text(self):
+        markdown = "```\nnot code\n\nstill text"
+        blocks = list(scan_blocks(markdown))
+        self.assertEqual(
+            [block.block_type for block in blocks],
+            [BlockType.PARAGRAPH, BlockType.PARAGRAPH],
+        )
+
+    def test_scan_blocks_line_numbers(self):
+        markdown = "# Title\n\n\n\n```\na\n\nb\n```\n- one\n- two\n\n  > quote"
+        blocks = list(scan_blocks(markdown))
+
+        self.assertEqual(
+            [(block.block_type, block.line_number) for block in blocks],
+            [
+                (BlockType.HEADING1, 0),
+                (BlockType.CODE, 4),
+                (BlockType.UNORDERED_LIST, 9),
+                (BlockType.QUOTE, 12),
+            ],
+        )
+        self.assertEqual(blocks[2].lines, ["- one", "- two"])
+
+    def test_scan_lines_matches_scan_blocks(self):
+        markdown = "Intro\n\n\n  # Title\n\n```\na\n\nb\n```\n- one\n\n```\nopen"
+        self.assertEqual(
+            [repr(block) for block in scan_lines(markdown.splitlines(True))],
+            [repr(block) for block in scan_blocks(markdown)],
+        )
+
+    def test_html_chunks_match_html_node(self):
+        markdown = "# Title\n\nSome **bold** text\n\n> quote"
+        self.assertEqual(
+            "".join(markdown_to_html_chunks(markdown.splitlines(True))),
+            markdown_to_html_node(markdown).to_html(),
+        )
+
+    def test_find_title(self):
+        markdown = "Intro\n\n# The **Title**\n\n# Second"
+        self.assertEqual(find_title(scan_blocks(markdown)), "The Title")
+
     def test_extracts_title_from_h1(self):
         markdown = "# This is the Title\n\nSome paragraph text."
         parent_node = markdown_to_html_node(markdown)
@@ -270,6 +330,59 @@ the **same** even with inline stuff
             extract_title(parent_node), "This is bold and italic in a title"
         )
 
+    def test_extract_title_from_nested_nodes(self):
+        parent_node = ParentNode(
+            "div",
+            [ParentNode("h1", [LeafNode(None, "A "), ParentNode("span", [LeafNode("b", "nested")])])],
+        )
+        self.assertEqual(extract_title(parent_node), "A nested")
+
+    def test_page_result(self):
+        markdown = (
+            "# The **Title**\n\n"
+            "Read [the docs](/docs) and ![a chart](/chart.png) here.\n\n"
+            "## Setup\n\n- see [home](/)\n\n## Setup\n\n### What's `new`?"
+        )
+        page = markdown_to_page(markdown, details=True)
+
+        self.assertEqual(page.node.to_html(), markdown_to_html_node(markdown).to_html())
+        self.assertEqual(page.title, "The Title")
+        self.assertEqual(
+            page.outline,
+            [
+                (1, "The Title", "the-title"),
+                (2, "Setup", "setup"),
+                (2, "Setup", "setup-1"),
+                (3, "What's new?", "whats-new"),
+            ],
+        )
+        self.assertEqual(page.words, 16)
+        self.assertEqual(page.links, ["/docs", "/"])
+        self.assertEqual(page.images, ["/chart.png"])
+        self.assertEqual(page.terms["setup"], 2)
+
+    def test_page_result_without_title(self):
+        page = markdown_to_page("Just text", details=True)
+        self.assertIsNone(page.title)
+        self.assertEqual(page.outline, [])
+
+    def test_page_result_details_are_opt_in(self):
+        page = markdown_to_page("# Title\n\nA [link](/a) here ![chart](/c.png)\n\n## Part")
+        self.assertEqual(page.title, "Title")
+        self.assertEqual(page.terms["link"], 1)
+        self.assertEqual(page.images, ["/c.png"])
+        self.assertEqual((page.outline, page.words, page.links), ([], 0, []))
+
+    def test_html_chunks_fill_page_result(self):
+        markdown = "# Title\n\nA [link](/a)\n\n## Part"
+        page = PageResult(details=True)
+        "".join(markdown_to_html_chunks(markdown.splitlines(True), page=page))
+        expected = markdown_to_page(markdown, details=True)
+        self.assertEqual(
+            (page.title, page.outline, page.words, page.links),
+            (expected.title, expected.outline, expected.words, expected.links),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,94 @@
+import os
+import unittest
+
+from pagemeta import PageIndex, listing_digest, listing_to_html_node, read_page_meta
+from tempsite import TempSiteTestCase
+
+
+class TestPageIndex(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = PageIndex(os.path.join(self.root, ".cache/pages.json"))
+
+    def add(self, name: str, contents: str) -> str:
+        path = self.write(name, contents)
+        self.index.refresh(path, "/" + os.path.dirname(name) + "/")
+        return path
+
+    def test_reads_header_and_title(self):
+        path = self.write("post.md", "---\ndate: 2024-01-01\n---\nIntro\n\n# The _Title_\n\nBody")
+        self.assertEqual(read_page_meta(path), ({"date": "2024-01-01"}, "The Title"))
+
+        path = self.write("untitled.md", "No heading")
+        self.assertEqual(read_page_meta(path), ({}, None))
+
+    def test_unchanged_pages_are_not_read_again(self):
+        path = self.add("blog/a/index.md", "---\ndate: 2024-01-01\n---\n# A")
+        self.index.pages[path]["title"] = "Cached"
+        self.assertEqual(self.index.refresh(path, "/blog/a/")["title"], "Cached")
+
+        self.write("blog/a/index.md", "---\ndate: 2024-01-02\n---\n# Changed")
+        self.assertEqual(self.index.refresh(path, "/blog/a/")["title"], "Changed")
+
+    def test_listing(self):
+        self.add("blog/a/index.md", "---\ndate: 2024-01-01\ntags: [python]\n---\n# A")
+        self.add("blog/b/index.md", "---\ndate: 2024-03-01\ntags: python\n---\n# B")
+        self.add("blog/c/index.md", "---\ndate: 2024-02-01\ndraft: true\n---\n# C")
+        self.add("blog/d/index.md", "# D")
+        self.add("blog/index.md", "---\nlist: blog\n---\n# Blog")
+        self.add("about/index.md", "# About")
+
+        blog_dir = os.path.join(self.root, "blog")
+        self.assertEqual(
+            [page["title"] for page in self.index.listing(blog_dir)], ["B", "A", "D"]
+        )
+        self.assertEqual(
+            [page["title"] for page in self.index.listing(blog_dir, "python")],
+            ["B", "A"],
+        )
+        self.assertEqual(
+            [page["title"] for page in self.index.listing_of(os.path.join(blog_dir, "index.md"), self.root)],
+            ["B", "A", "D"],
+        )
+
+    def test_listing_ignores_dates_written_as_lists(self):
+        self.add("blog/a/index.md", "---\ndate: 2024-01-01\n---\n# A")
+        self.add("blog/b/index.md", "---\ndate: [2024, 03]\n---\n# B")
+        self.add("blog/c/index.md", "---\ndate: 2024-02-01\n---\n# C")
+
+        listing = self.index.listing(os.path.join(self.root, "blog"))
+        self.assertEqual(
+            [(page["title"], page["date"]) for page in listing],
+            [("C", "2024-02-01"), ("A", "2024-01-01"), ("B", "")],
+        )
+
+    def test_list_written_as_a_list_is_not_a_listing(self):
+        self.add("blog/a/index.md", "# A")
+        self.add("blog/index.md", "---\nlist:\n- blog\n- news\n---\n# Blog")
+
+        listing = self.index.listing(os.path.join(self.root, "blog"))
+        self.assertEqual([page["title"] for page in listing], ["A", "Blog"])
+
+    def test_save_and_load(self):
+        path = self.add("blog/a/index.md", "---\ntags: [x]\n---\n# A")
+        self.index.start_build()
+        self.index.save()
+
+        loaded = PageIndex.load(self.index.path)
+        self.assertEqual(loaded.pages, self.index.pages)
+
+        loaded.prune()
+        self.assertEqual(loaded.pages, {})
+
+    def test_listing_html(self):
+        listing = [{"url": "/blog/a/", "title": "A", "date": "2024-01-01"}, {"url": "/b/", "title": "B", "date": ""}]
+        self.assertEqual(
+            listing_to_html_node(listing).to_html(),
+            '<ul class="listing"><li><a href="/blog/a/">A</a> <time datetime="2024-01-01">2024-01-01</time></li>'
+            '<li><a href="/b/">B</a></li></ul>',
+        )
+        self.assertNotEqual(listing_digest(listing), listing_digest(listing[:1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from preview import PageCache, PreviewHandler, page_source, render_preview
+from tempsite import TempSiteTestCase
+
+
+class TestPreview(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content_path = os.path.join(self.root, "content")
+        self.static_path = os.path.join(self.root, "static")
+        self.template_path = self.write(
+            "template.html", "<title>{{ Title }}</title>{{ Content }}"
+        )
+
+        self.index_path = self.write("content/index.md", "# Home")
+        self.post_path = self.write("content/blog/post/index.md", "# Post")
+        self.write("content/.drafts/index.md", "# Draft")
+        self.write("static/style.css", "body { margin: 0 }")
+
+        self.page_cache = PageCache()
+
+    def render(self, src_path: str) -> str:
+        return render_preview(src_path, self.template_path, self.page_cache).decode()
+
+    def test_page_source(self):
+        for url_path, src_path in [
+            ("/", self.index_path),
+            ("/index.html", self.index_path),
+            ("/blog/post/", self.post_path),
+            ("/blog/post/index.html", self.post_path),
+            ("/blog/post", None),
+            ("/blog/", None),
+            ("/.drafts/", None),
+            ("/style.css", None),
+            ("/../content/index.html", self.index_path),
+        ]:
+            self.assertEqual(page_source(url_path, self.content_path), src_path)
+
+    def test_rendered_once(self):
+        self.assertEqual(
+            self.render(self.index_path), "<title>Home</title><div><h1>Home</h1></div>"
+        )
+        self.render(self.index_path)
+        self.assertEqual((self.page_cache.hits, self.page_cache.misses), (1, 1))
+
+    def test_source_and_template_edits_invalidate(self):
+        self.render(self.index_path)
+
+        self.write("content/index.md", "# New home")
+        self.assertIn("<h1>New home</h1>", self.render(self.index_path))
+
+        self.write("template.html", "<main>{{ Content }}</main>")
+        self.assertTrue(self.render(self.index_path).startswith("<main>"))
+        self.assertEqual(self.page_cache.hits, 0)
+
+    def test_least_recently_used_is_evicted(self):
+        self.page_cache = PageCache(100)
+        self.render(self.index_path)
+        self.render(self.post_path)
+        self.render(self.index_path)
+        self.write("content/about.md", "# About")
+        self.render(os.path.join(self.content_path, "about.md"))
+
+        self.assertLessEqual(self.page_cache.size, 100)
+        self.render(self.index_path)
+        self.assertEqual(self.page_cache.hits, 2)
+        self.render(self.post_path)
+        self.assertEqual(self.page_cache.hits, 2)
+
+    def test_serves_pages_and_static_files(self):
+        handler = partial(
+            PreviewHandler,
+            directory=self.static_path,
+            find_page=lambda url_path: page_source(url_path, self.content_path),
+            render_page=lambda src_path: render_preview(
+                src_path, self.template_path, self.page_cache
+            ),
+        )
+        server = ThreadingHTTPServer(("localhost", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://localhost:{server.server_address[1]}"
+
+        try:
+            with urlopen(url + "/blog/post") as response:
+                self.assertEqual(response.url, url + "/blog/post/")
+                self.assertIn(b"<h1>Post</h1>", response.read())
+
+            with urlopen(url + "/style.css") as response:
+                self.assertEqual(response.read(), b"body { margin: 0 }")
+
+            os.remove(self.template_path)
+            with self.assertRaises(HTTPError) as raised:
+                urlopen(url + "/")
+            self.assertEqual(raised.exception.code, 500)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
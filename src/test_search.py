@@ -0,0 +1,92 @@
+import json
+import os
+import unittest
+
+from markdownblock import markdown_to_html_node
+from htmlnode import node_text
+from search import SearchIndex, count_terms
+from tempsite import TempSiteTestCase
+
+
+class TestSearch(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_path = os.path.join(self.root, ".cache/search.json")
+        self.search_path = os.path.join(self.root, "docs/search")
+
+    def read_index(self) -> dict:
+        index = {}
+        for name in sorted(os.listdir(self.search_path)):
+            with open(os.path.join(self.search_path, name)) as f:
+                index[name] = json.load(f)
+        return index
+
+    def build(self, pages: dict[str, str]) -> SearchIndex:
+        index = SearchIndex.load(self.cache_path, self.search_path)
+        for src_path, text in pages.items():
+            index.update(src_path, f"/{src_path}/", src_path.title(), count_terms(text))
+        index.retain(pages.keys())
+        index.write()
+        index.save()
+        return index
+
+    def test_count_terms(self):
+        self.assertEqual(
+            count_terms("The cat and THE hat, a " + "x" * 40),
+            {"the": 2, "cat": 1, "and": 1, "hat": 1},
+        )
+
+    def test_text_comes_from_rendered_nodes(self):
+        node = markdown_to_html_node(
+            "# Title\n\nSome **bold** text ![Alt words](/a.png)"
+        )
+        self.assertEqual(node_text(node), "Title Some  bold  text  Alt words")
+
+    def test_writes_prefix_shards(self):
+        self.build({"cats": "cats and hats", "dogs": "dogs and cats"})
+
+        index = self.read_index()
+        self.assertEqual(
+            sorted(index), ["an.json", "ca.json", "do.json", "docs.json", "ha.json"]
+        )
+        self.assertEqual(index["ca.json"], {"cats": [[0, 1], [1, 1]]})
+        self.assertEqual(index["docs.json"]["docs"]["1"], ["/dogs/", "Dogs"])
+
+    def test_only_changed_terms_are_rewritten(self):
+        self.build({"cats": "cats and hats", "dogs": "dogs and cats"})
+        hats_path = os.path.join(self.search_path, "ha.json")
+        os.utime(hats_path, ns=(0, 0))
+
+        self.build({"cats": "cats and hats", "dogs": "dogs and more cats"})
+
+        self.assertEqual(os.stat(hats_path).st_mtime_ns, 0)
+        self.assertEqual(self.read_index()["mo.json"], {"more": [[1, 1]]})
+
+    def test_incremental_matches_full_build(self):
+        self.build({"cats": "cats and hats", "dogs": "dogs and cats"})
+        self.build({"cats": "cats cats", "birds": "birds and cats"})
+        incremental = self.read_index()
+
+        os.remove(os.path.join(self.search_path, "docs.json"))
+        SearchIndex.load(self.cache_path, self.search_path).write()
+
+        self.assertEqual(self.read_index(), incremental)
+        self.assertNotIn("do.json", incremental)
+        self.assertNotIn("ha.json", incremental)
+
+    def test_full_write_keeps_static_files(self):
+        self.build({"cats": "cats and hats"})
+        os.remove(os.path.join(self.search_path, "docs.json"))
+        for name in ["ca.json", "synonyms.json", "zz.json"]:
+            with open(os.path.join(self.search_path, name), "w") as f:
+                f.write("{}")
+
+        self.build({"dogs": "dogs"})
+
+        self.assertEqual(
+            sorted(self.read_index()), ["do.json", "docs.json", "synonyms.json", "zz.json"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
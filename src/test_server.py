@@ -0,0 +1,76 @@
+import os
+import unittest
+
+from server import ReloadBroadcaster, SiteWatcher, serve_site
+from tempsite import TempSiteTestCase
+
+
+class TestSiteWatcher(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content_path = os.path.join(self.root, "content")
+        self.template_path = self.write("template.html", "{{ Content }}")
+
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post")
+
+        self.watcher = SiteWatcher([self.content_path, self.template_path])
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), ([], []))
+
+    def test_edit_and_new_file(self):
+        edited = self.write("content/blog/post.md", "# Edited post")
+        created = self.write("content/about.md", "# About")
+
+        self.assertEqual(self.watcher.poll(), (sorted([edited, created]), []))
+        self.assertEqual(self.watcher.poll(), ([], []))
+
+    def test_template_edit(self):
+        self.write("template.html", "<main>{{ Content }}</main>")
+        self.assertEqual(self.watcher.poll(), ([self.template_path], []))
+
+    def test_file_gone_before_stat(self):
+        # A dangling link is listed but can't be stat'ed, like a swap file
+        # removed between the two
+        os.symlink(
+            os.path.join(self.root, "gone.swp"),
+            os.path.join(self.content_path, ".index.md.swp"),
+        )
+        self.assertEqual(self.watcher.poll(), ([], []))
+
+    def test_removed_file(self):
+        removed = os.path.join(self.content_path, "index.md")
+        os.remove(removed)
+        self.assertEqual(self.watcher.poll(), ([], [removed]))
+
+    def test_failed_rebuild_keeps_watching(self):
+        rebuilds = []
+
+        def on_change(changed, removed):
+            rebuilds.append(changed)
+            if len(rebuilds) == 1:
+                raise Exception("Error: Broken page")
+            # Stands in for Ctrl-C once the next change is through
+            raise KeyboardInterrupt
+
+        changes = iter([([self.template_path], []), ([self.template_path], [])])
+        self.watcher.poll = lambda: next(changes)
+
+        serve_site(self.root, 0, self.watcher, on_change, interval=0)
+        self.assertEqual(rebuilds, [[self.template_path], [self.template_path]])
+
+
+class TestReloadBroadcaster(unittest.TestCase):
+    def test_wait_times_out_without_changes(self):
+        broadcaster = ReloadBroadcaster()
+        self.assertEqual(broadcaster.wait(0, 0.01), 0)
+
+    def test_notify_bumps_version(self):
+        broadcaster = ReloadBroadcaster()
+        broadcaster.notify()
+        self.assertEqual(broadcaster.wait(0, 0.01), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
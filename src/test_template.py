@@ -0,0 +1,79 @@
+import unittest
+
+from template import Template, base_path_rewriter, layout_path, load_template
+from tempsite import TempSiteTestCase
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{Content}}</main>")
+        self.assertEqual(
+            template.render({"Title": "Home", "Content": "<p>Hi</p>"}),
+            "<title>Home</title><main><p>Hi</p></main>",
+        )
+
+    def test_unknown_slots_are_kept(self):
+        template = Template("{{ Title }} {{ Missing }}")
+        self.assertEqual(template.render({"Title": "Home"}), "Home {{ Missing }}")
+
+    def test_callable_slot_streams_chunks(self):
+        template = Template("<main>{{ Content }}</main>")
+        chunks = list(
+            template.render_chunks({"Content": lambda: iter(["<p>", "</p>"])})
+        )
+        self.assertListEqual(chunks, ["<main>", "<p>", "</p>", "</main>"])
+
+    def test_base_path_is_applied_once(self):
+        template = Template(
+            '<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/"
+        )
+        self.assertEqual(
+            template.render({"Content": '<a href="/">Home</a>'}),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/">Home</a>',
+        )
+
+    def test_base_path_skips_other_urls(self):
+        source = (
+            '<script src="//cdn.example.com/a.js"></script>'
+            '<a href="https://a.b/">A</a><p>src="/ and href="/</p>'
+        )
+        self.assertEqual(Template(source, "/site/").render({}), source)
+
+    def test_base_path_rewriter(self):
+        rewrite_url = base_path_rewriter("/site/")
+        self.assertEqual(rewrite_url("/blog/"), "/site/blog/")
+        self.assertEqual(rewrite_url("//cdn.example.com/a.js"), "//cdn.example.com/a.js")
+        self.assertEqual(rewrite_url("https://a.b/"), "https://a.b/")
+        self.assertIsNone(base_path_rewriter("/"))
+
+
+class TestLoadTemplate(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template_path = self.write("template.html", "<main>{{ Content }}</main>")
+
+    def test_template_is_cached(self):
+        self.assertIs(
+            load_template(self.template_path), load_template(self.template_path)
+        )
+
+    def test_edited_template_is_reloaded(self):
+        template = load_template(self.template_path)
+        self.write("template.html", "<article>{{ Content }}</article>")
+        self.assertIsNot(load_template(self.template_path), template)
+        self.assertEqual(
+            load_template(self.template_path).render({"Content": ""}),
+            "<article></article>",
+        )
+
+    def test_layout_path(self):
+        blog_path = self.write("layouts/blog.html", "<article>{{ Content }}</article>")
+
+        self.assertEqual(layout_path(self.template_path, None), self.template_path)
+        self.assertEqual(layout_path(self.template_path, "blog"), blog_path)
+        with self.assertRaises(Exception):
+            layout_path(self.template_path, "missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
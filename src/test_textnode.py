@@ -21,6 +21,10 @@ class TestTextNode(unittest.TestCase):
         self.assertIsNotNone(node.url)
         self.assertIsNone(node2.url)
         
+    def test_no_dict(self):
+        node = TextNode("This is a text node", TextType.PLAIN)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_text(self):
         node = TextNode("This is a text node", TextType.PLAIN)
         html_node = text_node_to_html_node(node)
@@ -63,7 +67,7 @@ class TestTextNode(unittest.TestCase):
     def test_bad_bold_delimiter_split(self):
         node = TextNode("This is text with a **bold block word", TextType.PLAIN)
         
-        with self.assertRaises(Exception): split_nodes_delimiter([node], "**", TextType.CODE)
+        self.assertEqual([node], split_nodes_delimiter([node], "**", TextType.CODE))
         
     def test_multiple_delimiters(self):
         test_text = [
@@ -246,10 +250,9 @@ class TestTextNode(unittest.TestCase):
         ]
         self.assertListEqual(text_to_textnodes(text), expected)
 
-    def test_unclosed_bold_raises(self):
+    def test_unclosed_bold_is_text(self):
         text = "This is **bold text with no end and plain after"
-        with self.assertRaises(Exception):
-            text_to_textnodes(text)
+        self.assertListEqual(text_to_textnodes(text), [TextNode(text, TextType.PLAIN)])
 
     def test_malformed_image_syntax_fallback_to_plain(self):
         text = "Here’s an image ![alt text(https://bad.com/img.png)"
@@ -306,6 +309,62 @@ class TestTextNode(unittest.TestCase):
         
         self.assertListEqual(new_nodes, expected)
 
+    def test_adjacent_delimited_spans(self):
+        text = "**one** **two** _three_ _four_"
+        expected = [
+            TextNode("one", TextType.BOLD),
+            TextNode(" ", TextType.PLAIN),
+            TextNode("two", TextType.BOLD),
+            TextNode(" ", TextType.PLAIN),
+            TextNode("three", TextType.ITALIC),
+            TextNode(" ", TextType.PLAIN),
+            TextNode("four", TextType.ITALIC)
+        ]
+        self.assertListEqual(text_to_textnodes(text), expected)
+
+    def test_code_keeps_other_delimiters(self):
+        text = "Call `snake_case(**kwargs)` here"
+        expected = [
+            TextNode("Call ", TextType.PLAIN),
+            TextNode("snake_case(**kwargs)", TextType.CODE),
+            TextNode(" here", TextType.PLAIN)
+        ]
+        self.assertListEqual(text_to_textnodes(text), expected)
+
+    def test_empty_text(self):
+        self.assertListEqual(text_to_textnodes(""), [])
+
+    def test_unclosed_italic_is_text(self):
+        self.assertListEqual(
+            text_to_textnodes("This is _not closed"),
+            [TextNode("This is _not closed", TextType.PLAIN)]
+        )
+
+    def test_unclosed_delimiters_around_markup(self):
+        text = "snake_case, **`code`** and [a [link](/url) then ![no image"
+        expected = [
+            TextNode("snake_case, ", TextType.PLAIN),
+            TextNode("`code`", TextType.BOLD),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("a [link", TextType.URL, "/url"),
+            TextNode(" then ![no image", TextType.PLAIN),
+        ]
+        self.assertListEqual(text_to_textnodes(text), expected)
+
+    def test_failed_image_can_start_a_link(self):
+        self.assertListEqual(
+            text_to_textnodes("![alt\n[text](/url)"),
+            [
+                TextNode("![alt\n", TextType.PLAIN),
+                TextNode("text", TextType.URL, "/url"),
+            ]
+        )
+
+    def test_links_never_span_lines(self):
+        text = "[text](/url\n) and [text\n](/url)"
+        self.assertListEqual(text_to_textnodes(text), [TextNode(text, TextType.PLAIN)])
+        self.assertListEqual(extract_markdown_links(text), [])
+
     
     
 if __name__ == "__main__":
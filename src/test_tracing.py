@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+
+import tracing
+
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        tracing._events = None
+
+    def test_spans_are_ignored_when_disabled(self):
+        with tracing.span("read"):
+            pass
+        self.assertFalse(tracing.is_enabled())
+        self.assertListEqual(tracing.take_events(), [])
+
+    def test_span_records_complete_event(self):
+        tracing.enable()
+        with tracing.span("read", src_path="content/index.md"):
+            pass
+
+        events = tracing.take_events()
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["name"], "read")
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["pid"], os.getpid())
+        self.assertEqual(events[0]["args"], {"src_path": "content/index.md"})
+        self.assertGreaterEqual(events[0]["dur"], 0)
+        self.assertListEqual(tracing.take_events(), [])
+
+    def test_span_records_on_error(self):
+        tracing.enable()
+        with self.assertRaises(ValueError):
+            with tracing.span("markdown_to_html_node"):
+                raise ValueError("bad page")
+        self.assertEqual(len(tracing.take_events()), 1)
+
+    def test_save_chrome_trace(self):
+        tracing.enable()
+        with tracing.span("build"):
+            pass
+        tracing.add_events(
+            [{"name": "read", "ph": "X", "ts": 0, "dur": 1, "pid": -1, "tid": 1}]
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            tracing.save(path)
+            with open(path) as f:
+                trace = json.load(f)
+
+        names = [event["name"] for event in trace["traceEvents"]]
+        self.assertListEqual(names, ["build", "read", "process_name", "process_name"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import re
 from enum import Enum
+from typing import Iterator
 from htmlnode import HTMLNode, LeafNode, ImageLeafNode, ParentNode
 
 
@@ -12,6 +13,13 @@ class TextType(Enum):
     IMAGE = "image"
 
 
+# Images, links, code, bold and italic are found in a single left-to-right
+# scan. The leftmost construct wins and its contents are kept as-is; images
+# and links never span lines.
+INLINE_MARKERS = re.compile(r"[\[`*_]")
+INLINE_OPENER = re.compile(r"!\[|\[|`|\*\*|_")
+
+
 HTML_TEXT_TAGS = {
     TextType.BOLD: "b",
     TextType.ITALIC: "i",
@@ -23,6 +31,8 @@ HTML_TEXT_TAGS = {
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url=None) -> None:
         self.text = text
         self.text_type = text_type
@@ -74,48 +84,115 @@ def split_nodes_delimiter(
             new_nodes.append(node)
             continue
 
-        delim_len = len(delimiter)
-        i = 0
+        # Each delimiter is closed by the next one, a delimiter left without
+        # one stays in the text. Every character is looked at once.
+        text = node.text
         marker = 0
-        while i < len(node.text):
+        while True:
+            start = text.find(delimiter, marker)
+            if start == -1:
+                break
+            end = text.find(delimiter, start + len(delimiter))
+            if end == -1:
+                break
+
+            if start > marker:
+                new_nodes.append(TextNode(text[marker:start], TextType.PLAIN))
+            new_nodes.append(TextNode(text[start + len(delimiter) : end], text_type))
+            marker = end + len(delimiter)
+
+        if marker < len(text):
+            new_nodes.append(TextNode(text[marker:], TextType.PLAIN))
 
-            if node.text[i : i + delim_len] == delimiter:
-
-                new_nodes.append(TextNode(node.text[marker:i], TextType.PLAIN))
-
-                k = i + delim_len
-                while node.text[k : k + delim_len] != delimiter:
-                    if k + delim_len >= len(node.text):
-                        raise Exception(
-                            f'Error: Markdown tag "{delimiter}" not closed -> "{node.text[i:k]}"'
-                        )
-                    k += 1
+    return new_nodes
 
-                new_nodes.append(TextNode(node.text[i + delim_len : k], text_type))
-                i = k + delim_len + 1
-                marker = i - 1
 
-            i += 1
+class Finder:
+    # str.find for one needle that remembers its last answer. Scans only move
+    # forward, so an answer holds until the scan passes it, and no stretch of
+    # text is searched twice for the same needle.
+    __slots__ = ("text", "needle", "found")
 
-        if marker < len(node.text):
-            new_nodes.append(
-                TextNode(node.text[marker : len(node.text)], TextType.PLAIN)
-            )
+    def __init__(self, text: str, needle: str) -> None:
+        self.text = text
+        self.needle = needle
+        self.found = None
+
+    def find(self, start: int) -> int:
+        found = self.found
+        if found is None or -1 < found < start:
+            found = self.found = self.text.find(self.needle, start)
+        return found
+
+
+class LinkFinder:
+    def __init__(self, text: str) -> None:
+        self.middles = Finder(text, "](")
+        self.closes = Finder(text, ")")
+        self.lines = Finder(text, "\n")
+
+    def match(self, start: int, label_start: int) -> tuple[int, int]:
+        # The label runs to the first "](" and the URL to the first ")" after
+        # it, both on the line the link starts on
+        middle = self.middles.find(label_start)
+        if middle == -1:
+            return None
+
+        close = self.closes.find(middle + 2)
+        if close == -1:
+            return None
+
+        line_end = self.lines.find(start)
+        if line_end != -1 and line_end < close:
+            return None
+
+        return middle, close
+
+
+def find_markdown_links(text: str, opener: str) -> Iterator[tuple[int, int, int, int]]:
+    # Start, label end, URL end and end of every link, or image with "![",
+    # in one pass over the text
+    links = LinkFinder(text)
+    position = 0
+
+    while True:
+        start = text.find(opener, position)
+        if start == -1:
+            return
+        position = start + 1
+
+        # The "[" of an image is not a link
+        if opener == "[" and start > 0 and text[start - 1] == "!":
+            continue
 
-    return new_nodes
+        match = links.match(start, start + len(opener))
+        if match is not None:
+            middle, close = match
+            yield start, middle, close, close + 1
+            position = close + 1
 
 
 def extract_markdown_images(text: str) -> list[tuple[str, str]]:
-    matches = re.findall(r"!\[(.*?)\]\((.*?)\)", text)
-    return matches
+    return [
+        (text[start + 2 : middle], text[middle + 2 : close])
+        for start, middle, close, _ in find_markdown_links(text, "![")
+    ]
 
 
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
-    matches = re.findall(r"(?<!\!)\[(.*?)\]\((.*?)\)", text)
-    return matches
+    return [
+        (text[start + 1 : middle], text[middle + 2 : close])
+        for start, middle, close, _ in find_markdown_links(text, "[")
+    ]
 
 
 def split_nodes_images(old_nodes: list[TextNode]) -> list[TextNode]:
+    return split_nodes_links(old_nodes, "![", TextType.IMAGE)
+
+
+def split_nodes_links(
+    old_nodes: list[TextNode], opener: str = "[", text_type: TextType = TextType.URL
+) -> list[TextNode]:
     new_nodes = []
 
     for node in old_nodes:
@@ -126,71 +203,91 @@ def split_nodes_images(old_nodes: list[TextNode]) -> list[TextNode]:
             new_nodes.append(node)
             continue
 
-        imgs = extract_markdown_images(node.text)
-
-        if len(imgs) == 0:
-            new_nodes.append(node)
-            continue
-
+        # Cut at the positions the scan found, instead of searching again
+        text = node.text
         last_index = 0
-        for image in imgs:
-            txt_len = len(image[0]) + len(image[1]) + 5
-            index = node.text.find(f"![{image[0]}]", last_index)
-
-            new_nodes.append(TextNode(node.text[last_index:index], TextType.PLAIN))
-            new_nodes.append(TextNode(image[0], TextType.IMAGE, image[1]))
-
-            last_index = index + txt_len
-
-        if last_index < len(node.text):
+        for start, middle, close, end in find_markdown_links(text, opener):
+            if start > last_index:
+                new_nodes.append(TextNode(text[last_index:start], TextType.PLAIN))
             new_nodes.append(
-                TextNode(node.text[last_index : len(node.text)], TextType.PLAIN)
+                TextNode(
+                    text[start + len(opener) : middle],
+                    text_type,
+                    text[middle + 2 : close],
+                )
             )
+            last_index = end
 
-    return new_nodes
-
+        if last_index < len(text):
+            new_nodes.append(TextNode(text[last_index:], TextType.PLAIN))
 
-def split_nodes_links(old_nodes: list[TextNode]) -> list[TextNode]:
-    new_nodes = []
+    return new_nodes
 
-    for node in old_nodes:
 
-        if not isinstance(node, TextNode):
-            continue
-        if node.text_type != TextType.PLAIN:
-            new_nodes.append(node)
-            continue
+def text_to_textnodes(text: str) -> list[TextNode]:
 
-        urls = extract_markdown_links(node.text)
+    # Most spans contain no markup at all
+    if INLINE_MARKERS.search(text) is None:
+        return [TextNode(text, TextType.PLAIN)] if len(text) > 0 else []
 
-        if len(urls) == 0:
-            new_nodes.append(node)
+    # One left-to-right scan. At each opener the construct is closed by the
+    # first closer after it, or the opener is plain text. Closers are found
+    # with Finders, so the scan is linear in the length of the text, however
+    # many openers are left unclosed.
+    new_nodes = []
+    links = LinkFinder(text)
+    code_closes = Finder(text, "`")
+    bold_closes = Finder(text, "**")
+    italic_closes = Finder(text, "_")
+
+    plain_start = 0
+    position = 0
+    while True:
+        opener = INLINE_OPENER.search(text, position)
+        if opener is None:
+            break
+
+        start = opener.start()
+        node = None
+        match opener.group():
+            case "![" | "[":
+                match = links.match(start, opener.end())
+                if match is not None:
+                    middle, close = match
+                    node = TextNode(
+                        text[opener.end() : middle],
+                        TextType.IMAGE if opener.group() == "![" else TextType.URL,
+                        text[middle + 2 : close],
+                    )
+                    end = close + 1
+            case "`":
+                close = code_closes.find(start + 1)
+                if close != -1:
+                    node = TextNode(text[start + 1 : close], TextType.CODE)
+                    end = close + 1
+            case "**":
+                close = bold_closes.find(start + 2)
+                if close != -1:
+                    node = TextNode(text[start + 2 : close], TextType.BOLD)
+                    end = close + 2
+            case "_":
+                close = italic_closes.find(start + 1)
+                if close != -1:
+                    node = TextNode(text[start + 1 : close], TextType.ITALIC)
+                    end = close + 1
+
+        # An opener without a closer is plain text, the scan moves on by one
+        # character, so an unmatched "![" can still start a link
+        if node is None:
+            position = start + 1
             continue
 
-        last_index = 0
-        for url in urls:
-            txt_len = len(url[0]) + len(url[1]) + 4
-            index = node.text.find(f"[{url[0]}]", last_index)
-
-            new_nodes.append(TextNode(node.text[last_index:index], TextType.PLAIN))
-            new_nodes.append(TextNode(url[0], TextType.URL, url[1]))
-
-            last_index = index + txt_len
-
-        if last_index < len(node.text):
-            new_nodes.append(
-                TextNode(node.text[last_index : len(node.text)], TextType.PLAIN)
-            )
-
-    return new_nodes
-
-
-def text_to_textnodes(text: str) -> list[TextNode]:
+        if start > plain_start:
+            new_nodes.append(TextNode(text[plain_start:start], TextType.PLAIN))
+        new_nodes.append(node)
+        plain_start = position = end
 
-    new_nodes = split_nodes_images([TextNode(text, TextType.PLAIN)])
-    new_nodes = split_nodes_links(new_nodes)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", TextType.CODE)
-    new_nodes = split_nodes_delimiter(new_nodes, "**", TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "_", TextType.ITALIC)
+    if plain_start < len(text):
+        new_nodes.append(TextNode(text[plain_start:], TextType.PLAIN))
 
     return new_nodes
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Chrome trace events recorded by this process, None while tracing is off
+_events = None
+
+
+def enable():
+    global _events
+    if _events is None:
+        _events = []
+
+
+def start_worker():
+    # Forked workers inherit the parent's events, start them with none
+    global _events
+    _events = []
+
+
+def is_enabled() -> bool:
+    return _events is not None
+
+
+@contextmanager
+def span(name: str, **args):
+    if _events is None:
+        yield
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (time.perf_counter_ns() - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": args,
+            }
+        )
+
+
+def take_events() -> list[dict]:
+    # Workers hand their spans back with each result
+    global _events
+    if _events is None:
+        return []
+
+    events = _events
+    _events = []
+    return events
+
+
+def add_events(events: list[dict]):
+    if _events is not None:
+        _events.extend(events)
+
+
+def save(path: str):
+    events = list(_events or [])
+
+    # Name the processes so the viewer tells the build apart from workers
+    for pid in sorted({event["pid"] for event in events}):
+        events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "build" if pid == os.getpid() else f"worker {pid}"},
+            }
+        )
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)